@@ -0,0 +1,187 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+# ==== Admission Control ====
+
+# How much a single queue-time observation moves the moving average.
+QUEUE_TIME_SMOOTHING = 0.2
+
+# The limiter that admitted the current request, so downstream queues (such
+# as the storage thread pool) can report their wait time to it.
+_current_limiter: contextvars.ContextVar[Optional["RouteLimiter"]] = contextvars.ContextVar("current_limiter", default=None)
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of being admitted."""
+
+    def __init__(self, route: str, retry_after: int = 1):
+        super().__init__(f"Route '{route}' is overloaded.")
+        self.route = route
+        self.retry_after = retry_after
+
+class RouteLimiter:
+    """
+    Caps the number of concurrent requests for one route.
+
+    Requests beyond the cap wait for a slot for at most `max_queue_time`
+    seconds. While the smoothed queue time stays above `target_queue_time`,
+    the route is considered overloaded and requests that can't get a slot
+    immediately are shed instead of queued.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, target_queue_time: float = 0.05, max_queue_time: float = 0.5):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.target_queue_time = target_queue_time
+        self.max_queue_time = max_queue_time
+        self.in_flight = 0
+        self.queue_time_avg = 0.0
+        self.admitted = 0
+        self.shed = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to the loop they are first used on.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+        return self._semaphore
+
+    def _observe_queue_time(self, seconds: float):
+        self.queue_time_avg += QUEUE_TIME_SMOOTHING * (seconds - self.queue_time_avg)
+
+    @property
+    def overloaded(self) -> bool:
+        return self.queue_time_avg > self.target_queue_time
+
+    def should_shed(self) -> bool:
+        """Returns True if a new request would be shed without waiting."""
+        return self.overloaded and self.in_flight >= self.max_concurrent
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Admits the current request or raises Overloaded.
+        """
+        if self.should_shed():
+            self.shed += 1
+            raise Overloaded(self.name)
+
+        semaphore = self._get_semaphore()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.max_queue_time)
+        except asyncio.TimeoutError:
+            self._observe_queue_time(self.max_queue_time)
+            self.shed += 1
+            raise Overloaded(self.name)
+
+        self._observe_queue_time(time.monotonic() - start)
+        self.admitted += 1
+        self.in_flight += 1
+        # Restored with set() rather than reset(), since a streaming response
+        # may close this context from a different task.
+        previous = _current_limiter.get()
+        _current_limiter.set(self)
+        try:
+            yield
+        finally:
+            _current_limiter.set(previous)
+            self.in_flight -= 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "queue_time_avg": round(self.queue_time_avg, 4),
+            "overloaded": self.overloaded,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+def observe_queue_time(seconds: float):
+    """
+    Adds time the current request spent queued after admission (e.g. waiting
+    for a storage thread) to its route's queue-time signal.
+    """
+    limiter = _current_limiter.get()
+    if limiter is not None:
+        limiter._observe_queue_time(seconds)
+
+# ==== Degraded Click Counting ====
+
+# Fraction of clicks counted while /track is in degraded mode.
+DEGRADED_SAMPLE_RATE = 0.1
+
+class ClickSampler:
+    """
+    Counts a random sample of clicks in memory while /track is degraded.
+
+    The sample rate is kept alongside the counts so they can be scaled back
+    up to an estimate of the real click volume. Counts live in this process
+    only until they are drained and written to storage.
+    """
+
+    def __init__(self, sample_rate: float = DEGRADED_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, book_id: str):
+        if random.random() >= self.sample_rate:
+            return
+        with self._lock:
+            self._counts[book_id] = self._counts.get(book_id, 0) + 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Returns the sampled counts together with the sample rate they were
+        taken at.
+        """
+        with self._lock:
+            return {"sample_rate": self.sample_rate, "counts": dict(self._counts)}
+
+    def estimated_clicks(self) -> Dict[str, int]:
+        """Returns the sampled counts scaled back up by the sample rate."""
+        snapshot = self.snapshot()
+        rate = snapshot["sample_rate"]
+        return {book_id: round(count / rate) for book_id, count in snapshot["counts"].items()}
+
+    def has_samples(self) -> bool:
+        with self._lock:
+            return bool(self._counts)
+
+    def drain(self) -> Dict[str, int]:
+        """
+        Returns the estimated clicks per book, like estimated_clicks(), and
+        clears the sampled counts.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        return {book_id: round(count / self.sample_rate) for book_id, count in counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts = {}
+
+# Per-route limits. /track only writes one event, but that write needs a
+# storage thread, so its limit stays close to async_storage.STORAGE_MAX_WORKERS
+# and any wait for a storage thread also counts toward its queue time.
+# /analytics reads the full event history and campaign status the whole
+# catalog, so only a few of those may run at once.
+limiters: Dict[str, RouteLimiter] = {
+    "track": RouteLimiter("track", max_concurrent=8, target_queue_time=0.02, max_queue_time=0.05),
+    "books": RouteLimiter("books", max_concurrent=32),
+    "analytics": RouteLimiter("analytics", max_concurrent=2, max_queue_time=2.0),
+    "ingest": RouteLimiter("ingest", max_concurrent=4, max_queue_time=1.0),
+    "campaigns": RouteLimiter("campaigns", max_concurrent=2, max_queue_time=1.0),
+}
+
+click_sampler = ClickSampler()
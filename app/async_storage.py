@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, TypeVar
+
+from . import admission
+from . import storage
+
+T = TypeVar("T")
+
+# Storage file I/O runs on its own bounded pools so a slow disk can't tie up
+# the event loop, and so outbound HTTP work on the default threadpool can't
+# starve the hot /track and /books/{id} paths of storage threads. Work that
+# reads or rewrites a whole data file (ingest, analytics, campaign status)
+# gets a separate pool, so it can never occupy the threads the hot paths
+# depend on.
+STORAGE_MAX_WORKERS = 4
+BULK_STORAGE_MAX_WORKERS = 2
+_executor = ThreadPoolExecutor(max_workers=STORAGE_MAX_WORKERS, thread_name_prefix="storage")
+_bulk_executor = ThreadPoolExecutor(max_workers=BULK_STORAGE_MAX_WORKERS, thread_name_prefix="storage-bulk")
+
+async def _run_on(executor: ThreadPoolExecutor, func: Callable[..., T], *args: Any) -> T:
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context over so per-request stage timings still work.
+    context = contextvars.copy_context()
+    submitted = time.perf_counter()
+
+    def call():
+        return time.perf_counter() - submitted, func(*args)
+
+    waited, result = await loop.run_in_executor(executor, functools.partial(context.run, call))
+    # Time spent waiting for a free storage thread counts as queue time for
+    # the route that admitted the request. It is applied here, on the event
+    # loop, since the limiters aren't thread-safe.
+    admission.observe_queue_time(waited)
+    return result
+
+async def run(func: Callable[..., T], *args: Any) -> T:
+    """
+    Runs a blocking storage-bound callable on the storage thread pool.
+
+    Args:
+        func: The synchronous callable to run.
+        *args: Positional arguments passed to the callable.
+
+    Returns:
+        Whatever the callable returns.
+    """
+    return await _run_on(_executor, func, *args)
+
+async def run_bulk(func: Callable[..., T], *args: Any) -> T:
+    """
+    Like run(), but for callables that read or rewrite a whole data file,
+    which run on the separate bulk storage pool.
+    """
+    return await _run_on(_bulk_executor, func, *args)
+
+async def _warm_up_pool(run_on_pool: Callable, workers: int):
+    barrier = threading.Barrier(workers)
+    # Each task blocks until all of them are running, which forces the pool
+    # to spawn its full set of threads.
+    try:
+        await asyncio.gather(*(run_on_pool(barrier.wait, 5.0) for _ in range(workers)))
+    except threading.BrokenBarrierError:
+        print("[WARNING] Timed out while starting the storage thread pool.")
+
+async def warm_up():
+    """
+    Starts every storage worker thread ahead of the first request.
+    """
+    await _warm_up_pool(run, STORAGE_MAX_WORKERS)
+    await _warm_up_pool(run_bulk, BULK_STORAGE_MAX_WORKERS)
+
+# The wrappers look up the storage function at call time so that patching
+# app.storage (as the tests do) also affects the async API.
+
+async def save_books(books: List[Dict[str, Any]]):
+    return await run_bulk(storage.save_books, books)
+
+async def load_books() -> Dict[str, Any]:
+    return await run_bulk(storage.load_books)
+
+async def load_book_by_id(book_id: str) -> Optional[Dict[str, Any]]:
+    return await run(storage.load_book_by_id, book_id)
+
+async def save_campaign(campaign_data: Dict[str, Any]) -> Dict[str, Any]:
+    return await run_bulk(storage.save_campaign, campaign_data)
+
+async def load_campaigns() -> Dict[str, Any]:
+    return await run_bulk(storage.load_campaigns)
+
+async def load_campaign_by_id(campaign_id: str) -> Optional[Dict[str, Any]]:
+    return await run(storage.load_campaign_by_id, campaign_id)
+
+async def log_event(event_data: Dict[str, Any]):
+    return await run(storage.log_event, event_data)
+
+async def load_metrics() -> List[Dict[str, Any]]:
+    return await run_bulk(storage.load_metrics)
+
+async def aggregate_clicks() -> Dict[str, Any]:
+    return await run_bulk(storage.aggregate_clicks)
+
+async def load_deliveries(campaign_id: str) -> Dict[str, Any]:
+    return await run(storage.load_deliveries, campaign_id)
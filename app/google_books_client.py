@@ -1,37 +1,137 @@
+import contextvars
 import requests
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from . import profiling
 
 GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
 
-def fetch_books_by_author(author_name: str, api_key: str) -> List[Dict[str, Any]]:
+# Global cap on in-flight Google Books API calls, shared by every bulk ingest
+# running in this process so that parallel syncs can't exhaust the API quota.
+MAX_CONCURRENT_REQUESTS = 8
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+class GoogleBooksError(Exception):
+    """Raised when a Google Books API lookup fails."""
+
+def _request_volumes(query: str, api_key: str) -> List[Dict[str, Any]]:
     """
-    Fetches a list of books for a given author from the Google Books API.
+    Runs a single volumes search against the Google Books API.
 
     Args:
-        author_name: The name of the author to search for.
+        query: The Google Books search query (e.g. "inauthor:Jane Doe").
         api_key: The Google Books API key.
 
     Returns:
-        A list of book data dictionaries, or an empty list if an error occurs.
+        A list of book data dictionaries.
+
+    Raises:
+        GoogleBooksError: If the API key is missing, the request fails or the
+            response can't be decoded.
     """
     if not api_key:
-        print("[ERROR] Google Books API key is not provided.")
-        return []
+        raise GoogleBooksError("Google Books API key is not provided.")
 
     params = {
-        "q": f"inauthor:{author_name}",
+        "q": query,
         "key": api_key,
         "maxResults": 40  # Fetch the maximum number of results per page
     }
 
     try:
-        response = requests.get(GOOGLE_BOOKS_API_URL, params=params)
+        with _request_slots, profiling.stage("outbound_http"):
+            response = requests.get(GOOGLE_BOOKS_API_URL, params=params)
         response.raise_for_status()  # Raise an exception for bad status codes
         data = response.json()
         return data.get("items", [])
     except requests.exceptions.RequestException as e:
-        print(f"[ERROR] An error occurred while calling the Google Books API: {e}")
-        return []
-    except ValueError:
-        print("[ERROR] Could not decode the response from the Google Books API.")
+        raise GoogleBooksError(f"An error occurred while calling the Google Books API: {e}") from e
+    except ValueError as e:
+        raise GoogleBooksError("Could not decode the response from the Google Books API.") from e
+
+def _search_volumes(query: str, api_key: str) -> List[Dict[str, Any]]:
+    """
+    Like _request_volumes, but prints errors and returns an empty list.
+    """
+    try:
+        return _request_volumes(query, api_key)
+    except GoogleBooksError as e:
+        print(f"[ERROR] {e}")
         return []
+
+def fetch_books_by_author(author_name: str, api_key: str) -> List[Dict[str, Any]]:
+    """
+    Fetches a list of books for a given author from the Google Books API.
+
+    Args:
+        author_name: The name of the author to search for.
+        api_key: The Google Books API key.
+
+    Returns:
+        A list of book data dictionaries, or an empty list if an error occurs.
+    """
+    return _search_volumes(f"inauthor:{author_name}", api_key)
+
+def fetch_books_by_isbn(isbn: str, api_key: str) -> List[Dict[str, Any]]:
+    """
+    Fetches the books matching a given ISBN from the Google Books API.
+
+    Args:
+        isbn: The ISBN-10 or ISBN-13 to search for.
+        api_key: The Google Books API key.
+
+    Returns:
+        A list of book data dictionaries, or an empty list if an error occurs.
+    """
+    return _search_volumes(f"isbn:{isbn}", api_key)
+
+# Search query prefix for each kind of bulk lookup.
+_QUERY_PREFIXES = {"author": "inauthor:", "isbn": "isbn:"}
+
+def _bulk_lookup(kind: str, query: str, api_key: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    try:
+        return _request_volumes(f"{_QUERY_PREFIXES[kind]}{query}", api_key), None
+    except GoogleBooksError as e:
+        print(f"[ERROR] Bulk lookup of {kind} '{query}' failed: {e}")
+        return [], str(e)
+
+def fetch_books_bulk(
+    author_names: List[str],
+    isbns: List[str],
+    api_key: str,
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+) -> Iterator[Tuple[str, str, List[Dict[str, Any]], Optional[str]]]:
+    """
+    Fetches books for many authors and ISBNs concurrently.
+
+    Results are yielded as soon as each lookup finishes, so callers can report
+    progress while the remaining lookups are still in flight. A failed lookup
+    is reported with its error instead of looking like one with no results.
+
+    Args:
+        author_names: The author names to search for.
+        isbns: The ISBNs to search for.
+        api_key: The Google Books API key.
+        max_workers: The number of worker threads to use.
+
+    Yields:
+        Tuples of (kind, query, books, error) where kind is "author" or
+        "isbn" and error is None unless the lookup failed.
+    """
+    lookups = [("author", name) for name in author_names] + [("isbn", isbn) for isbn in isbns]
+    if not lookups:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(lookups)))) as executor:
+        # Each lookup runs in a copy of the caller's context so its outbound
+        # HTTP time is attributed to the request that started the ingest.
+        futures = {
+            executor.submit(contextvars.copy_context().run, _bulk_lookup, kind, query, api_key): (kind, query)
+            for kind, query in lookups
+        }
+        for future in as_completed(futures):
+            kind, query = futures[future]
+            books, error = future.result()
+            yield kind, query, books, error
@@ -0,0 +1,175 @@
+import json
+import json.scanner
+import re
+import time
+from typing import Any, IO, Iterator, Tuple
+
+# Incremental readers for the top-level arrays and objects our data files are
+# made of. Only one element is decoded at a time (using the stdlib C scanner
+# through JSONDecoder.raw_decode), so memory stays proportional to the largest
+# single element rather than to the whole file.
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_SEPARATOR = re.compile(r"[ \t\n\r]*,[ \t\n\r]*")
+# Characters that could continue a number cut off by a chunk boundary.
+_NUMBER_TAIL = re.compile(r"[0-9.eE+\-]*")
+# What a chunk boundary can leave where the scanner gave up: nothing, a
+# partial number or a prefix of a literal.
+_PARTIAL_TOKEN = re.compile(
+    r"[ \t\n\r]*(?:[0-9.eE+\-]*|t(?:r(?:ue?)?)?|f(?:a(?:l(?:se?)?)?)?|n(?:u(?:ll?)?)?"
+    r"|N(?:aN?)?|-?I(?:n(?:f(?:i(?:n(?:i(?:ty?)?)?)?)?)?)?)"
+)
+# The scanner behind JSONDecoder.raw_decode, minus its per-call overhead.
+_scan_once = json.scanner.make_scanner(json.JSONDecoder())
+
+class TruncatedJsonError(json.JSONDecodeError):
+    """Raised when the file ends in the middle of a value."""
+
+class JsonStreamReader:
+    """
+    Reads a single top-level JSON array or object from a text file in chunks.
+    """
+
+    def __init__(self, f: IO[str], chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        # Time spent reading and decoding, so callers can report the two
+        # separately.
+        self.read_seconds = 0.0
+        self.parse_seconds = 0.0
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        start = time.perf_counter()
+        chunk = self.f.read(self.chunk_size)
+        self.read_seconds += time.perf_counter() - start
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop the consumed prefix so the buffer doesn't grow with the file.
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.buf, self.pos)
+
+    def _peek(self) -> str:
+        # Skips whitespace and returns the next character, or "" at EOF.
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise self._error(f"Expecting '{char}'")
+        self.pos += 1
+
+    def _cut_off(self, message: str, pos: int) -> bool:
+        # Whether the scanner failed because the value runs past the end of
+        # the buffer, as opposed to the data being invalid.
+        if message.startswith("Unterminated string"):
+            return True
+        if message.startswith("Invalid \\uXXXX escape"):
+            return len(self.buf) - pos < 6
+        return _PARTIAL_TOKEN.fullmatch(self.buf, pos) is not None
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            start = time.perf_counter()
+            try:
+                obj, end = _scan_once(self.buf, self.pos)
+            except (json.JSONDecodeError, StopIteration) as e:
+                self.parse_seconds += time.perf_counter() - start
+                if isinstance(e, StopIteration):
+                    message, pos = "Expecting value", e.value
+                else:
+                    message, pos = e.msg, e.pos
+                # Only read more when that can help, so invalid data fails
+                # right away instead of pulling the rest of the file in.
+                if not self._cut_off(message, pos):
+                    raise json.JSONDecodeError(message, self.buf, pos)
+                if not self._fill():
+                    raise TruncatedJsonError(message, self.buf, pos)
+                continue
+            self.parse_seconds += time.perf_counter() - start
+            # A number followed only by characters that could continue it
+            # (e.g. "1" then "." at the end of a chunk) may be truncated.
+            if (
+                isinstance(obj, (int, float))
+                and not isinstance(obj, bool)
+                and _NUMBER_TAIL.match(self.buf, end).end() == len(self.buf)
+                and self._fill()
+            ):
+                continue
+            self.pos = end
+            return obj
+
+    def _elements(self, close: str) -> Iterator[None]:
+        # Yields once per element, with the reader positioned at its start.
+        if self._peek() == close:
+            self.pos += 1
+            return
+        while True:
+            yield
+            # Fast path: a separator that is fully inside the buffer.
+            match = _SEPARATOR.match(self.buf, self.pos)
+            if match and match.end() < len(self.buf):
+                self.pos = match.end()
+                continue
+            char = self._peek()
+            if char == close:
+                self.pos += 1
+                return
+            if char != ",":
+                raise self._error(f"Expecting ',' or '{close}'")
+            self.pos += 1
+
+    def iter_array(self) -> Iterator[Any]:
+        """
+        Yields the elements of a top-level JSON array one at a time.
+
+        An empty file yields nothing. Malformed input raises
+        json.JSONDecodeError, or TruncatedJsonError if the file ends in the
+        middle of an element.
+        """
+        if self._peek() == "":
+            return
+        self._expect("[")
+        for _ in self._elements("]"):
+            yield self._value()
+
+    def iter_object(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Yields the (key, value) pairs of a top-level JSON object one at a time.
+
+        An empty file yields nothing. Malformed input raises
+        json.JSONDecodeError.
+        """
+        if self._peek() == "":
+            return
+        self._expect("{")
+        for _ in self._elements("}"):
+            key = self._value()
+            if not isinstance(key, str):
+                raise self._error("Expecting property name")
+            self._expect(":")
+            yield key, self._value()
+
+def iter_array(f: IO[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """Yields the elements of the top-level JSON array in a file."""
+    return JsonStreamReader(f, chunk_size).iter_array()
+
+def iter_object(f: IO[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """Yields the (key, value) pairs of the top-level JSON object in a file."""
+    return JsonStreamReader(f, chunk_size).iter_object()
@@ -3,10 +3,11 @@
 # Goal: Automate a strategic launch wave for 250+ eBooks now available in Europe
 # This script prepares and executes multi-channel distribution + indexing
 
+import hashlib
 import os
 import requests
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 # ==== CONFIGURATION ====
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -69,9 +70,29 @@ def launch_wave(titles: List[str]):
         print("========================\n")
     print(f"Launch wave completed for {len(titles)} titles.")
 
+X_CHANNEL = "x"
+
+def message_hash(message: str) -> str:
+    """Returns a short, stable hash identifying the exact text of a post."""
+    return hashlib.sha256(message.encode("utf-8")).hexdigest()[:16]
+
+def build_campaign_message(campaign: dict, book_id: str, book: dict) -> str:
+    """
+    Builds the post announcing a single book of a campaign.
+    """
+    book_title = book.get("volumeInfo", {}).get("title", "Unknown Title")
+    # In a real app, you would get this from your own domain
+    book_url = f"http://localhost:8000/track/{book_id}"
+
+    return f"{campaign['promo_message']}\n\nCheck out '{book_title}'!\n{book_url}"
+
 def launch_campaign(campaign_id: str):
     """
     Launches a promotional campaign by posting to X.
+
+    Each post is checked against the campaign's delivery ledger first, so a
+    relaunch only sends the posts that previously failed, were never sent, or
+    whose message has changed since the last launch.
     """
     print(f"Launching campaign {campaign_id}...")
     campaign = storage.load_campaign_by_id(campaign_id)
@@ -85,19 +106,72 @@ def launch_campaign(campaign_id: str):
     access_token = os.getenv("X_ACCESS_TOKEN")
     access_token_secret = os.getenv("X_ACCESS_TOKEN_SECRET")
 
+    skipped = 0
+
     for book_id in campaign.get("book_ids", []):
         book = storage.load_book_by_id(book_id)
         if not book:
             print(f"[WARNING] Book with ID {book_id} not found in storage.")
             continue
 
-        book_title = book.get("volumeInfo", {}).get("title", "Unknown Title")
-        # In a real app, you would get this from your own domain
-        book_url = f"http://localhost:8000/track/{book_id}"
-
         # Construct the tweet
-        message = f"{campaign['promo_message']}\n\nCheck out '{book_title}'!\n{book_url}"
+        message = build_campaign_message(campaign, book_id, book)
+        digest = message_hash(message)
 
-        x_client.post_tweet(message, api_key, api_secret, access_token, access_token_secret)
+        # Claim the post first so an overlapping launch can't send it too.
+        if not storage.claim_delivery(campaign_id, book_id, X_CHANNEL, digest):
+            skipped += 1
+            continue
 
+        try:
+            result = x_client.post_tweet(message, api_key, api_secret, access_token, access_token_secret)
+        except Exception as e:
+            # Release the claim so the next launch retries this post, and
+            # carry on with the remaining books.
+            print(f"[ERROR] Posting book {book_id} of campaign {campaign_id} failed: {e}")
+            storage.record_delivery(campaign_id, book_id, X_CHANNEL, digest, "failed", str(e))
+            continue
+
+        status = "delivered" if result.get("status") == "success" else "failed"
+        storage.record_delivery(campaign_id, book_id, X_CHANNEL, digest, status, result.get("message"))
+
+    if skipped:
+        print(f"[INFO] Skipped {skipped} posts already delivered or in flight for campaign {campaign_id}.")
     print(f"Campaign {campaign_id} launched successfully.")
+
+def get_campaign_status(campaign_id: str) -> Optional[dict]:
+    """
+    Summarizes the delivery state of a campaign from its ledger.
+
+    A book counts as delivered only if its current message was delivered, so
+    editing the promo message or a book title puts it back to pending. Posts
+    that are still being sent also count as pending.
+
+    Returns:
+        A dictionary with delivered, pending and failed counts, or None if the
+        campaign does not exist.
+    """
+    campaign = storage.load_campaign_by_id(campaign_id)
+    if not campaign:
+        return None
+
+    deliveries = storage.load_deliveries(campaign_id)
+    book_ids = set(campaign.get("book_ids", []))
+    books = {book_id: book for book_id, book in storage.iter_books() if book_id in book_ids}
+    counts = {"delivered": 0, "pending": 0, "failed": 0}
+
+    for book_id in campaign.get("book_ids", []):
+        book = books.get(book_id)
+        if not book:
+            counts["pending"] += 1
+            continue
+
+        digest = message_hash(build_campaign_message(campaign, book_id, book))
+        record = deliveries.get(storage.delivery_key(book_id, X_CHANNEL), {})
+        status = record.get("status") if record.get("message_hash") == digest else None
+        if status in ("delivered", "failed"):
+            counts[status] += 1
+        else:
+            counts["pending"] += 1
+
+    return {"campaign_id": campaign_id, "total": len(campaign.get("book_ids", [])), **counts}
@@ -1,16 +1,80 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import hmac
+import importlib
 import os
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+import sys
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, BackgroundTasks, Header, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List
-from . import launch
-from . import google_books_client
+from typing import List, Optional
 from . import storage
+from . import async_storage
+from . import admission
+from . import profiling
+from . import templating
+
+# The outbound integrations (launch, google_books_client, x_client and the
+# requests library behind them) are loaded lazily through _integration(), so
+# a fresh worker doesn't pay for them before serving /track, and the import
+# only ever competes with the first request that actually needs it.
+async def _integration(name: str):
+    """
+    Returns an integration module, importing it on a worker thread the first
+    time so the import never blocks the event loop.
+    """
+    module_name = f"{__package__}.{name}"
+    module = sys.modules.get(module_name)
+    if module is None:
+        started = time.perf_counter()
+        module = await asyncio.to_thread(importlib.import_module, module_name)
+        imports = startup_report.setdefault("integration_imports_ms", {})
+        imports[name] = round((time.perf_counter() - started) * 1000, 2)
+    return module
+
+templates = templating.create_templates()
+
+startup_report = {"import_ms": round((time.perf_counter() - _import_started) * 1000, 2)}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warms the template and storage caches before the worker takes traffic,
+    and records how long each step took in startup_report.
+    """
+    started = time.perf_counter()
+
+    step = time.perf_counter()
+    startup_report["templates"] = templating.warm_templates(templates)
+    startup_report["templates_ms"] = round((time.perf_counter() - step) * 1000, 2)
+
+    step = time.perf_counter()
+    await async_storage.warm_up()
+    startup_report["storage_pool_ms"] = round((time.perf_counter() - step) * 1000, 2)
+
+    startup_report["startup_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    print(f"[INFO] Worker ready: imports {startup_report['import_ms']} ms, startup {startup_report['startup_ms']} ms")
+    yield
+
+    await _flush_sampled_clicks()
+    await async_storage.run_bulk(storage.shutdown_aggregation_pool)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
-templates = Jinja2Templates(directory="templates")
+app.add_middleware(profiling.SlowRequestMiddleware)
+
+@app.exception_handler(admission.Overloaded)
+async def overloaded_handler(request: Request, exc: admission.Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 class LaunchRequest(BaseModel):
     titles: List[str]
@@ -18,6 +82,10 @@ class LaunchRequest(BaseModel):
 class IngestRequest(BaseModel):
     author_name: str
 
+class BulkIngestRequest(BaseModel):
+    author_names: List[str] = []
+    isbns: List[str] = []
+
 class CampaignCreate(BaseModel):
     name: str
     book_ids: List[str]
@@ -32,6 +100,7 @@ async def launch_endpoint(request: LaunchRequest, background_tasks: BackgroundTa
     """
     Accepts a list of book titles and triggers the launch wave in the background.
     """
+    launch = await _integration("launch")
     background_tasks.add_task(launch.launch_wave, request.titles)
     return {"message": "Launch wave initiated in the background."}
 
@@ -44,23 +113,97 @@ async def ingest_google_books_endpoint(request: IngestRequest):
     if not google_books_api_key:
         raise HTTPException(status_code=500, detail="GOOGLE_BOOKS_API_KEY environment variable not set.")
 
-    books = google_books_client.fetch_books_by_author(request.author_name, google_books_api_key)
-    if not books:
-        return {"message": f"No books found for author '{request.author_name}'."}
+    google_books_client = await _integration("google_books_client")
+    async with admission.limiters["ingest"].admit():
+        books = await run_in_threadpool(google_books_client.fetch_books_by_author, request.author_name, google_books_api_key)
+        if not books:
+            return {"message": f"No books found for author '{request.author_name}'."}
 
-    storage.save_books(books)
+        await async_storage.save_books(books)
     return {"message": f"Successfully ingested {len(books)} books by '{request.author_name}'."}
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/ingest/google-books/bulk")
+async def bulk_ingest_google_books_endpoint(request: BulkIngestRequest):
+    """
+    Ingests books for many authors and/or ISBNs concurrently and streams
+    per-lookup progress as Server-Sent Events. Failed lookups carry an
+    "error" field. The fetched books are saved to storage in a single write
+    when the stream ends, including when the client disconnects early.
+    """
+    google_books_api_key = os.getenv("GOOGLE_BOOKS_API_KEY")
+    if not google_books_api_key:
+        raise HTTPException(status_code=500, detail="GOOGLE_BOOKS_API_KEY environment variable not set.")
+    if not request.author_names and not request.isbns:
+        raise HTTPException(status_code=400, detail="Provide at least one author name or ISBN.")
+
+    google_books_client = await _integration("google_books_client")
+
+    limiter = admission.limiters["ingest"]
+    # Shed up front while we can still answer with a 503; the slot itself is
+    # held for the lifetime of the stream below.
+    if limiter.should_shed():
+        limiter.shed += 1
+        raise admission.Overloaded(limiter.name)
+
+    async def event_stream():
+        total = len(request.author_names) + len(request.isbns)
+        books_by_id = {}
+        completed = 0
+        failed = 0
+        try:
+            async with limiter.admit():
+                try:
+                    results = google_books_client.fetch_books_bulk(
+                        request.author_names, request.isbns, google_books_api_key
+                    )
+                    # The fetches block, so each result is awaited off the event loop.
+                    while True:
+                        result = await run_in_threadpool(next, results, None)
+                        if result is None:
+                            break
+                        kind, query, books, error = result
+                        completed += 1
+                        for book in books:
+                            if book.get("id"):
+                                books_by_id[book["id"]] = book
+                        progress = {
+                            kind: query,
+                            "books_found": len(books),
+                            "completed": completed,
+                            "total": total,
+                        }
+                        if error:
+                            failed += 1
+                            progress["error"] = error
+                        yield _sse("progress", progress)
+                finally:
+                    # Runs on a client disconnect too, so fetched books are
+                    # never thrown away. Shielded so a cancelled stream still
+                    # finishes the write.
+                    if books_by_id:
+                        await asyncio.shield(async_storage.save_books(list(books_by_id.values())))
+        except admission.Overloaded as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+        yield _sse("done", {"completed": completed, "failed": failed, "books_ingested": len(books_by_id)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/books/{book_id}", response_class=HTMLResponse)
 async def get_book_page(request: Request, book_id: str):
     """
     Renders an HTML page for a specific book.
     """
-    book = storage.load_book_by_id(book_id)
+    async with admission.limiters["books"].admit():
+        book = await async_storage.load_book_by_id(book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
-    return templates.TemplateResponse(request=request, name="book.html", context={"book": book})
+    with profiling.stage("template_render"):
+        return templates.TemplateResponse(request=request, name="book.html", context={"book": book})
 
 @app.post("/campaigns", status_code=201)
 async def create_campaign(campaign: CampaignCreate):
@@ -68,7 +211,7 @@ async def create_campaign(campaign: CampaignCreate):
     Creates a new promotional campaign.
     """
     campaign_dict = campaign.model_dump()
-    new_campaign = storage.save_campaign(campaign_dict)
+    new_campaign = await async_storage.save_campaign(campaign_dict)
     if not new_campaign:
         raise HTTPException(status_code=500, detail="Failed to create campaign.")
     return new_campaign
@@ -78,19 +221,59 @@ async def launch_campaign_endpoint(campaign_id: str, background_tasks: Backgroun
     """
     Launches a promotional campaign in the background.
     """
+    launch = await _integration("launch")
     background_tasks.add_task(launch.launch_campaign, campaign_id)
     return {"message": f"Campaign {campaign_id} launch initiated in the background."}
 
+@app.get("/campaigns/{campaign_id}/status")
+async def get_campaign_status_endpoint(campaign_id: str):
+    """
+    Reports delivered, pending and failed post counts for a campaign.
+    """
+    launch = await _integration("launch")
+    async with admission.limiters["campaigns"].admit():
+        status = await async_storage.run_bulk(launch.get_campaign_status, campaign_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return status
+
+async def _flush_sampled_clicks():
+    """
+    Writes the clicks sampled while /track was degraded to storage, as one
+    event per book carrying the estimated number of clicks.
+    """
+    sample_rate = admission.click_sampler.sample_rate
+    for book_id, count in admission.click_sampler.drain().items():
+        await async_storage.log_event({
+            "event_type": "click",
+            "book_id": book_id,
+            "count": count,
+            "sample_rate": sample_rate,
+        })
+
 @app.get("/track/{book_id}")
-async def track_click(book_id: str):
+async def track_click(book_id: str, background_tasks: BackgroundTasks):
     """
     Logs a click event for a book and redirects to the book's page.
+
+    Under overload the click is counted in memory at the degraded sample rate
+    instead of being written to storage, so the redirect is never delayed.
+    Once the route recovers, the sampled clicks are written to storage after
+    the response has been sent.
     """
     event_data = {
         "event_type": "click",
         "book_id": book_id,
     }
-    storage.log_event(event_data)
+    limiter = admission.limiters["track"]
+    try:
+        async with limiter.admit():
+            await async_storage.log_event(event_data)
+    except admission.Overloaded:
+        admission.click_sampler.record(book_id)
+    else:
+        if not limiter.overloaded and admission.click_sampler.has_samples():
+            background_tasks.add_task(_flush_sampled_clicks)
 
     return RedirectResponse(url=f"/books/{book_id}", status_code=307)
 
@@ -99,19 +282,75 @@ async def get_analytics():
     """
     Returns a summary of the analytics data.
     """
-    metrics = storage.load_metrics()
+    async with admission.limiters["analytics"].admit():
+        analytics = await async_storage.aggregate_clicks()
+
+    # Sampled clicks count toward the totals once they are flushed to
+    # storage. Until then they only exist in the worker that sampled them, so
+    # they are reported separately and marked with that worker.
+    estimated_clicks = admission.click_sampler.estimated_clicks()
+    if estimated_clicks:
+        analytics["unflushed_sampled_clicks"] = {
+            "worker_pid": os.getpid(),
+            "sample_rate": admission.click_sampler.sample_rate,
+            "estimated_clicks_per_book": estimated_clicks,
+        }
+
+    return analytics
+
+# ==== Admin Diagnostics ====
+
+def _require_admin(admin_key: Optional[str]):
+    expected_key = os.getenv("ADMIN_API_KEY")
+    if not expected_key:
+        raise HTTPException(status_code=500, detail="ADMIN_API_KEY environment variable not set.")
+    # Constant-time comparison, so response timing doesn't leak the key.
+    if not hmac.compare_digest((admin_key or "").encode("utf-8"), expected_key.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin key.")
+
+@app.post("/admin/profile", response_class=PlainTextResponse)
+async def profile_endpoint(seconds: float = 5.0, x_admin_key: Optional[str] = Header(None)):
+    """
+    Samples every thread's stack for the given number of seconds and returns
+    the result as collapsed stacks, ready for flamegraph.pl or speedscope.
+    """
+    _require_admin(x_admin_key)
+    if not 0 < seconds <= profiling.MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {profiling.MAX_PROFILE_SECONDS}.")
 
-    total_clicks = 0
-    clicks_per_book = {}
+    try:
+        counts = await run_in_threadpool(profiling.sample_stacks, seconds)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiling.collapse_stacks(counts)
+
+@app.get("/admin/admission")
+async def admission_stats_endpoint(x_admin_key: Optional[str] = Header(None)):
+    """
+    Returns the current admission control state of every limited route.
+    """
+    _require_admin(x_admin_key)
+    return {
+        "routes": {name: limiter.stats() for name, limiter in admission.limiters.items()},
+        "sampled_clicks": admission.click_sampler.snapshot(),
+    }
 
-    for event in metrics:
-        if event.get("event_type") == "click":
-            total_clicks += 1
-            book_id = event.get("book_id")
-            if book_id:
-                clicks_per_book[book_id] = clicks_per_book.get(book_id, 0) + 1
+@app.get("/admin/startup")
+async def startup_report_endpoint(x_admin_key: Optional[str] = Header(None)):
+    """
+    Returns the timing report recorded while this worker started up.
+    """
+    _require_admin(x_admin_key)
+    return startup_report
 
+@app.get("/admin/slow-requests")
+async def slow_requests_endpoint(x_admin_key: Optional[str] = Header(None)):
+    """
+    Returns the most recent requests that exceeded the slow request threshold,
+    with a per-stage timing breakdown.
+    """
+    _require_admin(x_admin_key)
     return {
-        "total_clicks": total_clicks,
-        "clicks_per_book": clicks_per_book,
+        "threshold_ms": profiling.SLOW_REQUEST_THRESHOLD * 1000,
+        "requests": profiling.slow_requests(),
     }
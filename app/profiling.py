@@ -0,0 +1,157 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Any, List, Optional
+
+# ==== Sampling Profiler ====
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+MAX_PROFILE_SECONDS = 60
+
+_profile_lock = threading.Lock()
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+def sample_stacks(seconds: float, interval: float = DEFAULT_SAMPLE_INTERVAL) -> Dict[str, int]:
+    """
+    Samples the stacks of every other thread in the process for a while.
+
+    Only one profile can run at a time. Nothing is installed in the profiled
+    threads, so the overhead is limited to the sampling thread itself.
+
+    Args:
+        seconds: How long to sample for, capped at MAX_PROFILE_SECONDS.
+        interval: The delay between two samples, in seconds.
+
+    Returns:
+        A dictionary mapping collapsed stacks (root first, frames separated
+        by ";") to the number of samples they were seen in.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running.")
+
+    try:
+        own_thread = threading.get_ident()
+        deadline = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+        counts: Dict[str, int] = {}
+
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                counts[key] = counts.get(key, 0) + 1
+            time.sleep(interval)
+
+        return counts
+    finally:
+        _profile_lock.release()
+
+def collapse_stacks(counts: Dict[str, int]) -> str:
+    """
+    Formats sampled stacks in the collapsed format read by flamegraph.pl
+    and speedscope, heaviest stacks first.
+    """
+    lines = [f"{stack} {count}" for stack, count in sorted(counts.items(), key=lambda item: -item[1])]
+    return "\n".join(lines) + ("\n" if lines else "")
+
+# ==== Slow Request Recorder ====
+
+SLOW_REQUEST_THRESHOLD = float(os.getenv("SLOW_REQUEST_THRESHOLD", "0.5"))
+SLOW_REQUEST_BUFFER_SIZE = 100
+
+_current_stages: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_stages", default=None)
+_slow_requests: Deque[Dict[str, Any]] = deque(maxlen=SLOW_REQUEST_BUFFER_SIZE)
+
+@contextmanager
+def stage(name: str):
+    """
+    Times a named stage of the current request (e.g. "storage_load").
+
+    Repeated stages add up. Outside of a tracked request this does nothing
+    beyond reading the clock.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+def record_stage(name: str, seconds: float):
+    """
+    Adds time measured elsewhere to a named stage of the current request.
+    """
+    stages = _current_stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+@contextmanager
+def track_request(method: str, path: str):
+    """
+    Tracks one request and records it if it took longer than
+    SLOW_REQUEST_THRESHOLD seconds.
+
+    Yields a dictionary the caller can set "status_code" on.
+    """
+    stages: Dict[str, float] = {}
+    token = _current_stages.set(stages)
+    info: Dict[str, Any] = {"status_code": None}
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        duration = time.perf_counter() - start
+        _current_stages.reset(token)
+        if duration >= SLOW_REQUEST_THRESHOLD:
+            _slow_requests.append({
+                "method": method,
+                "path": path,
+                "status_code": info["status_code"],
+                "duration_ms": round(duration * 1000, 2),
+                "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in stages.items()},
+                "timestamp": time.time(),
+            })
+
+class SlowRequestMiddleware:
+    """
+    Plain ASGI middleware that tracks every HTTP request with track_request.
+
+    It avoids BaseHTTPMiddleware so the hot /track path doesn't pay for an
+    extra task and response wrapping on every request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_request(scope["method"], scope["path"]) as info:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    info["status_code"] = message["status"]
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+
+def slow_requests() -> List[Dict[str, Any]]:
+    """Returns the recorded slow requests, most recent first."""
+    return list(reversed(_slow_requests))
+
+def clear_slow_requests():
+    _slow_requests.clear()
@@ -1,10 +1,32 @@
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 import os
+import threading
+import time
+
+from . import json_stream
+from . import profiling
 
 DATA_DIR = "data"
 BOOKS_FILE = os.path.join(DATA_DIR, "books.json")
 
+# Writers run on a thread pool, so every read-modify-write of a data file is
+# serialized by that file's lock.
+_books_lock = threading.Lock()
+
+def _write_json_atomic(path: str, data: Any):
+    """
+    Writes JSON to a temporary file and moves it over `path`, so readers
+    never see a partly written file.
+    """
+    if not os.path.exists(DATA_DIR):
+        os.makedirs(DATA_DIR)
+
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_file, path)
+
 def save_books(books: List[Dict[str, Any]]):
     """
     Saves a list of books to a JSON file, indexed by book ID.
@@ -14,21 +36,55 @@ def save_books(books: List[Dict[str, Any]]):
         books: A list of book data dictionaries from the Google Books API.
     """
     try:
-        if not os.path.exists(DATA_DIR):
-            os.makedirs(DATA_DIR)
-
-        existing_books = load_books()
-        for book in books:
-            book_id = book.get("id")
-            if book_id:
-                existing_books[book_id] = book
-
-        with open(BOOKS_FILE, "w") as f:
-            json.dump(existing_books, f, indent=4)
+        with _books_lock:
+            existing_books = load_books()
+            for book in books:
+                book_id = book.get("id")
+                if book_id:
+                    existing_books[book_id] = book
+
+            _write_json_atomic(BOOKS_FILE, existing_books)
         print(f"[INFO] Successfully saved/updated {len(books)} books in {BOOKS_FILE}")
     except IOError as e:
         print(f"[ERROR] An error occurred while saving books to {BOOKS_FILE}: {e}")
 
+def _stream_json_file(path: str, array: bool) -> Iterator[Any]:
+    """
+    Streams the elements of a JSON array (or the (key, value) pairs of a JSON
+    object) stored in a file, without loading the whole document.
+
+    Read and parse time are reported as request stages. Errors are printed
+    and end the iteration early, like the loaders below.
+    """
+    try:
+        if not os.path.exists(path):
+            return
+
+        with open(path, "r") as f:
+            reader = json_stream.JsonStreamReader(f)
+            try:
+                yield from (reader.iter_array() if array else reader.iter_object())
+            except json_stream.TruncatedJsonError:
+                # Event files are appended to in place, so an array whose last
+                # element stops at the end of the file is a write in progress.
+                if not array:
+                    raise
+                print(f"[WARNING] Skipped a partly written event at the end of {path}")
+            finally:
+                profiling.record_stage("storage_load", reader.read_seconds)
+                profiling.record_stage("json_parse", reader.parse_seconds)
+    except (IOError, json.JSONDecodeError) as e:
+        print(f"[ERROR] An error occurred while reading {path}: {e}")
+
+def iter_books() -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Iterates over the stored books without loading the whole catalog.
+
+    Yields:
+        (book_id, book) tuples in file order.
+    """
+    return _stream_json_file(BOOKS_FILE, array=False)
+
 def load_books() -> Dict[str, Any]:
     """
     Loads a dictionary of books from a JSON file.
@@ -36,31 +92,24 @@ def load_books() -> Dict[str, Any]:
     Returns:
         A dictionary of book data, with book IDs as keys.
     """
-    try:
-        if not os.path.exists(BOOKS_FILE):
-            return {}
-
-        with open(BOOKS_FILE, "r") as f:
-            content = f.read()
-            if not content:
-                return {}
-            return json.loads(content)
-    except (IOError, json.JSONDecodeError) as e:
-        print(f"[ERROR] An error occurred while loading books from {BOOKS_FILE}: {e}")
-        return {}
+    return dict(iter_books())
 
 def load_book_by_id(book_id: str) -> Optional[Dict[str, Any]]:
     """
     Loads a single book by its ID from the JSON file.
 
+    The catalog is streamed and the scan stops at the first match.
+
     Args:
         book_id: The ID of the book to retrieve.
 
     Returns:
         A dictionary of book data, or None if the book is not found.
     """
-    books = load_books()
-    return books.get(book_id)
+    for current_id, book in iter_books():
+        if current_id == book_id:
+            return book
+    return None
 
 # ==== Campaign Storage ====
 
@@ -68,6 +117,8 @@ import uuid
 
 CAMPAIGNS_FILE = os.path.join(DATA_DIR, "campaigns.json")
 
+_campaigns_lock = threading.Lock()
+
 def save_campaign(campaign_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Saves a new campaign to the campaigns file.
@@ -79,17 +130,14 @@ def save_campaign(campaign_data: Dict[str, Any]) -> Dict[str, Any]:
         The full campaign data, including its new ID.
     """
     try:
-        if not os.path.exists(DATA_DIR):
-            os.makedirs(DATA_DIR)
-
-        campaigns = load_campaigns()
+        with _campaigns_lock:
+            campaigns = load_campaigns()
 
-        campaign_id = str(uuid.uuid4())
-        campaign_data["id"] = campaign_id
-        campaigns[campaign_id] = campaign_data
+            campaign_id = str(uuid.uuid4())
+            campaign_data["id"] = campaign_id
+            campaigns[campaign_id] = campaign_data
 
-        with open(CAMPAIGNS_FILE, "w") as f:
-            json.dump(campaigns, f, indent=4)
+            _write_json_atomic(CAMPAIGNS_FILE, campaigns)
 
         print(f"[INFO] Successfully saved campaign {campaign_id} to {CAMPAIGNS_FILE}")
         return campaign_data
@@ -109,12 +157,14 @@ def load_campaigns() -> Dict[str, Any]:
             return {}
 
         with open(CAMPAIGNS_FILE, "r") as f:
-            content = f.read()
+            with profiling.stage("storage_load"):
+                content = f.read()
             if not content:
                 return {}
-            return json.loads(content)
+            with profiling.stage("json_parse"):
+                return json.loads(content)
     except (IOError, json.JSONDecodeError) as e:
-        print(f"[ERROR] An error occurred while loading campaigns from {CAMPAIGains_FILE}: {e}")
+        print(f"[ERROR] An error occurred while loading campaigns from {CAMPAIGNS_FILE}: {e}")
         return {}
 
 def load_campaign_by_id(campaign_id: str) -> Optional[Dict[str, Any]]:
@@ -132,49 +182,484 @@ def load_campaign_by_id(campaign_id: str) -> Optional[Dict[str, Any]]:
 
 # ==== Analytics Storage ====
 
+import multiprocessing
+import zlib
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 
 METRICS_FILE = os.path.join(DATA_DIR, "metrics.json")
 
+# Events are split across METRICS_SHARDS files by a stable hash of book_id,
+# so clicks on different books don't contend for one file. Shards are
+# newline-delimited JSON: each event is one line added with a single O_APPEND
+# write, which is safe without locks even across worker processes, and a
+# reader only ever has to skip a last line that is still being written.
+# The original single METRICS_FILE and the JSON array shards that preceded
+# the line format are still read as legacy files so existing history keeps
+# counting.
+METRICS_SHARDS = 8
+
+# Below this many bytes of event history, aggregation runs in-process since
+# shipping the work to other processes would cost more than it saves.
+PARALLEL_AGGREGATION_MIN_BYTES = 1_000_000
+AGGREGATION_WORKERS = os.cpu_count() or 1
+
+# One long-lived pool, created on first use. Workers come from a forkserver
+# rather than being forked from the (multithreaded) server process.
+_aggregation_pool: Optional[ProcessPoolExecutor] = None
+_aggregation_pool_lock = threading.Lock()
+
+# Within one process, keeps the check for a torn last line and the append
+# that follows it together.
+_shard_locks = [threading.Lock() for _ in range(METRICS_SHARDS)]
+
+def metrics_shard_for(book_id: Optional[str]) -> int:
+    """
+    Returns the shard index an event for the given book is stored in.
+    """
+    return zlib.crc32((book_id or "").encode("utf-8")) % METRICS_SHARDS
+
+def metrics_shard_file(shard: int) -> str:
+    """
+    Returns the path of a metrics shard file, derived from METRICS_FILE.
+    """
+    base, _ = os.path.splitext(str(METRICS_FILE))
+    return f"{base}.{shard}.jsonl"
+
+def _legacy_metrics_shard_file(shard: int) -> str:
+    base, ext = os.path.splitext(str(METRICS_FILE))
+    return f"{base}.{shard}{ext}"
+
+def migrated_metrics_shard_file(shard: int) -> str:
+    """
+    Returns the path holding the events of the legacy METRICS_FILE that
+    belong to a shard, once migrate_legacy_metrics has run.
+    """
+    base, _ = os.path.splitext(str(METRICS_FILE))
+    return f"{base}.{shard}.legacy.jsonl"
+
+def metrics_files() -> List[str]:
+    """
+    Returns the legacy metrics files followed by every shard file.
+    """
+    if os.path.exists(METRICS_FILE):
+        # Not migrated yet, or a migration is in progress: the legacy file
+        # is still the complete copy of the old history.
+        legacy_files = [str(METRICS_FILE)]
+    else:
+        legacy_files = [migrated_metrics_shard_file(shard) for shard in range(METRICS_SHARDS)]
+    legacy_files += [_legacy_metrics_shard_file(shard) for shard in range(METRICS_SHARDS)]
+    return legacy_files + [metrics_shard_file(shard) for shard in range(METRICS_SHARDS)]
+
+def _iter_event_lines(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the events of a newline-delimited JSON shard.
+
+    A last line without a newline is an append in progress and is skipped,
+    as is (with an error) any line that isn't valid JSON, so damage to one
+    event never hides the events after it.
+    """
+    try:
+        if not os.path.exists(path):
+            return
+
+        read_seconds = 0.0
+        parse_seconds = 0.0
+        line_number = 0
+        try:
+            with open(path, "r") as f:
+                while True:
+                    start = time.perf_counter()
+                    lines = f.readlines(json_stream.DEFAULT_CHUNK_SIZE)
+                    read_seconds += time.perf_counter() - start
+                    if not lines:
+                        break
+
+                    start = time.perf_counter()
+                    events = []
+                    for line in lines:
+                        line_number += 1
+                        if not line.endswith("\n"):
+                            print(f"[WARNING] Skipped a partly written event at the end of {path}")
+                            break
+                        if not line.strip():
+                            continue
+                        try:
+                            events.append(json.loads(line))
+                        except json.JSONDecodeError as e:
+                            print(f"[ERROR] Skipped an invalid event on line {line_number} of {path}: {e}")
+                    parse_seconds += time.perf_counter() - start
+                    yield from events
+        finally:
+            profiling.record_stage("storage_load", read_seconds)
+            profiling.record_stage("json_parse", parse_seconds)
+    except IOError as e:
+        print(f"[ERROR] An error occurred while reading {path}: {e}")
+
+def _iter_events_file(path: str) -> Iterator[Dict[str, Any]]:
+    if path.endswith(".jsonl"):
+        return _iter_event_lines(path)
+    return _stream_json_file(path, array=True)
+
+def _append_line(path: str, line: bytes):
+    """
+    Appends one line to a file with a single O_APPEND write.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        size = os.fstat(fd).st_size
+        if size:
+            os.lseek(fd, size - 1, os.SEEK_SET)
+            if os.read(fd, 1) != b"\n":
+                # A writer died mid-line. End that line so this event isn't
+                # glued onto it; readers report and skip the damaged line.
+                line = b"\n" + line
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
 def log_event(event_data: Dict[str, Any]):
     """
-    Logs a new event to the metrics file.
+    Logs a new event to the metrics shard for its book.
 
     Args:
         event_data: A dictionary containing the event details.
     """
+    shard = metrics_shard_for(event_data.get("book_id"))
+    shard_file = metrics_shard_file(shard)
     try:
         if not os.path.exists(DATA_DIR):
             os.makedirs(DATA_DIR)
 
-        metrics = load_metrics()
-
         event_data["timestamp"] = datetime.now(timezone.utc).isoformat()
-        metrics.append(event_data)
+        line = (json.dumps(event_data) + "\n").encode("utf-8")
 
-        with open(METRICS_FILE, "w") as f:
-            json.dump(metrics, f, indent=4)
+        with _shard_locks[shard]:
+            _append_line(shard_file, line)
 
         print(f"[INFO] Successfully logged event: {event_data['event_type']}")
     except IOError as e:
-        print(f"[ERROR] An error occurred while logging event to {METRICS_FILE}: {e}")
+        print(f"[ERROR] An error occurred while logging event to {shard_file}: {e}")
+
+def migrate_legacy_metrics() -> Optional[int]:
+    """
+    Spreads the events of the legacy single METRICS_FILE across per-shard
+    files, so the old history is aggregated in parallel like the rest.
+
+    The events are written to one file per shard, each replaced atomically,
+    and only then is METRICS_FILE renamed to "<METRICS_FILE>.migrated".
+    Until that rename readers keep using METRICS_FILE, and an interrupted
+    migration can simply be run again. (The JSON array shards that came
+    before the line format are already split by shard and stay as they are.)
+
+    Returns:
+        The number of migrated events, or None if the legacy file could not
+        be read in full, in which case it is left untouched.
+    """
+    legacy_file = str(METRICS_FILE)
+    if not os.path.exists(legacy_file):
+        return 0
+
+    tmp_files = [f"{migrated_metrics_shard_file(shard)}.tmp" for shard in range(METRICS_SHARDS)]
+    migrated = 0
+    try:
+        with ExitStack() as stack:
+            outputs = [stack.enter_context(open(path, "w")) for path in tmp_files]
+            f = stack.enter_context(open(legacy_file, "r"))
+            # Unlike iter_metrics, stop on any damage rather than migrating a
+            # partial history.
+            for event in json_stream.iter_array(f):
+                outputs[metrics_shard_for(event.get("book_id"))].write(json.dumps(event) + "\n")
+                migrated += 1
+
+        for shard, tmp_file in enumerate(tmp_files):
+            os.replace(tmp_file, migrated_metrics_shard_file(shard))
+        os.replace(legacy_file, f"{legacy_file}.migrated")
+    except (IOError, json.JSONDecodeError) as e:
+        print(f"[ERROR] Could not migrate {legacy_file}, leaving it in place: {e}")
+        for tmp_file in tmp_files:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        return None
+
+    print(f"[INFO] Migrated {migrated} events from {legacy_file} into {METRICS_SHARDS} shards")
+    return migrated
+
+def iter_metrics() -> Iterator[Dict[str, Any]]:
+    """
+    Iterates over every metric event, from the legacy file and then each
+    shard in turn, without loading them into memory.
+
+    Yields:
+        Event data dictionaries, in file order rather than timestamp order.
+    """
+    for path in metrics_files():
+        yield from _iter_events_file(path)
 
 def load_metrics() -> List[Dict[str, Any]]:
     """
-    Loads a list of metric events from a JSON file.
+    Loads every metric event from the legacy file and all shards.
 
     Returns:
-        A list of event data dictionaries.
+        A list of event data dictionaries, ordered by timestamp.
+    """
+    metrics = list(iter_metrics())
+    metrics.sort(key=lambda event: event.get("timestamp", ""))
+    return metrics
+
+def aggregate_clicks_file(path: str) -> Dict[str, Any]:
     """
+    Computes the click aggregate for a single metrics file.
+
+    This is a module-level function so it can run in a worker process.
+
+    Args:
+        path: The path of the metrics file to aggregate.
+
+    Returns:
+        A dictionary with total_clicks and clicks_per_book.
+    """
+    total_clicks = 0
+    clicks_per_book = {}
+
+    for event in _iter_events_file(path):
+        if event.get("event_type") == "click":
+            # Clicks sampled while /track was degraded are stored as one
+            # event per book carrying the estimated number of clicks.
+            count = event.get("count", 1)
+            total_clicks += count
+            book_id = event.get("book_id")
+            if book_id:
+                clicks_per_book[book_id] = clicks_per_book.get(book_id, 0) + count
+
+    return {"total_clicks": total_clicks, "clicks_per_book": clicks_per_book}
+
+def _get_aggregation_pool() -> ProcessPoolExecutor:
+    global _aggregation_pool
+    with _aggregation_pool_lock:
+        if _aggregation_pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _aggregation_pool = ProcessPoolExecutor(max_workers=AGGREGATION_WORKERS, mp_context=context)
+        return _aggregation_pool
+
+def shutdown_aggregation_pool():
+    """
+    Stops the aggregation worker processes, if they were started.
+    """
+    global _aggregation_pool
+    with _aggregation_pool_lock:
+        if _aggregation_pool is not None:
+            _aggregation_pool.shutdown()
+            _aggregation_pool = None
+
+def aggregate_clicks() -> Dict[str, Any]:
+    """
+    Aggregates clicks across all metrics files.
+
+    Each file is aggregated separately and the partial results are merged.
+    Once the history is large enough, the files are spread over the shared
+    aggregation process pool so aggregation uses every core.
+
+    Returns:
+        A dictionary with total_clicks and clicks_per_book.
+    """
+    paths = [path for path in metrics_files() if os.path.exists(path)]
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+
+    if len(paths) > 1 and total_bytes >= PARALLEL_AGGREGATION_MIN_BYTES:
+        partials = list(_get_aggregation_pool().map(aggregate_clicks_file, paths))
+    else:
+        partials = [aggregate_clicks_file(path) for path in paths]
+
+    total_clicks = 0
+    clicks_per_book = {}
+    for partial in partials:
+        total_clicks += partial["total_clicks"]
+        for book_id, count in partial["clicks_per_book"].items():
+            clicks_per_book[book_id] = clicks_per_book.get(book_id, 0) + count
+
+    return {"total_clicks": total_clicks, "clicks_per_book": clicks_per_book}
+
+# ==== Campaign Delivery Ledger ====
+
+import re
+
+# One ledger file per campaign, holding one record per (book, channel): the
+# latest message posted for it. A new message replaces the record of the old
+# one, so a ledger never grows beyond the size of its campaign.
+DELIVERIES_DIR = os.path.join(DATA_DIR, "deliveries")
+# The single all-campaigns ledger used before; still read so campaigns
+# launched before the split keep their history.
+DELIVERIES_FILE = os.path.join(DATA_DIR, "deliveries.json")
+
+_deliveries_locks: Dict[str, threading.Lock] = {}
+_deliveries_locks_lock = threading.Lock()
+
+def _deliveries_lock(campaign_id: str) -> threading.Lock:
+    with _deliveries_locks_lock:
+        return _deliveries_locks.setdefault(campaign_id, threading.Lock())
+
+def deliveries_file(campaign_id: str) -> str:
+    """
+    Returns the path of the delivery ledger of a campaign.
+    """
+    if not re.fullmatch(r"[\w-]+", campaign_id):
+        raise ValueError(f"Invalid campaign ID: {campaign_id!r}")
+    return os.path.join(str(DELIVERIES_DIR), f"{campaign_id}.json")
+
+def delivery_key(book_id: str, channel: str) -> str:
+    """
+    Builds the ledger key for the posts of one book on one channel.
+
+    Args:
+        book_id: The ID of the promoted book.
+        channel: The channel the message is posted to (e.g. "x").
+
+    Returns:
+        The ledger key string.
+    """
+    return f"{book_id}:{channel}"
+
+def _load_legacy_deliveries(campaign_id: str) -> Dict[str, Any]:
     try:
-        if not os.path.exists(METRICS_FILE):
-            return []
+        if not os.path.exists(DELIVERIES_FILE):
+            return {}
 
-        with open(METRICS_FILE, "r") as f:
+        with open(DELIVERIES_FILE, "r") as f:
             content = f.read()
+        legacy = json.loads(content).get(campaign_id, {}) if content else {}
+    except (IOError, json.JSONDecodeError) as e:
+        print(f"[ERROR] An error occurred while loading deliveries from {DELIVERIES_FILE}: {e}")
+        return {}
+
+    # Legacy records were keyed per message; keep the latest per book.
+    deliveries: Dict[str, Any] = {}
+    for record in sorted(legacy.values(), key=lambda record: record.get("timestamp", "")):
+        deliveries[delivery_key(record["book_id"], record["channel"])] = record
+    return deliveries
+
+def _load_campaign_deliveries(campaign_id: str) -> Dict[str, Any]:
+    path = deliveries_file(campaign_id)
+    try:
+        if not os.path.exists(path):
+            return _load_legacy_deliveries(campaign_id)
+
+        with open(path, "r") as f:
+            with profiling.stage("storage_load"):
+                content = f.read()
             if not content:
-                return []
-            return json.loads(content)
+                return {}
+            with profiling.stage("json_parse"):
+                return json.loads(content)
     except (IOError, json.JSONDecodeError) as e:
-        print(f"[ERROR] An error occurred while loading metrics from {METRICS_FILE}: {e}")
-        return []
+        print(f"[ERROR] An error occurred while loading deliveries from {path}: {e}")
+        return {}
+
+def _write_campaign_deliveries(campaign_id: str, deliveries: Dict[str, Any]):
+    # Callers must hold the campaign's ledger lock.
+    os.makedirs(DELIVERIES_DIR, exist_ok=True)
+    _write_json_atomic(deliveries_file(campaign_id), deliveries)
+
+def load_deliveries(campaign_id: str) -> Dict[str, Any]:
+    """
+    Loads the delivery ledger for a single campaign.
+
+    Args:
+        campaign_id: The ID of the campaign.
+
+    Returns:
+        A dictionary of delivery records, keyed by delivery key.
+    """
+    with _deliveries_lock(campaign_id):
+        return _load_campaign_deliveries(campaign_id)
+
+# A "sending" claim older than this is assumed to belong to a launch that
+# died mid-post, and may be claimed again.
+SENDING_CLAIM_TIMEOUT = 600
+
+def _delivery_record(book_id: str, channel: str, message_hash: str, status: str, detail: Optional[str]) -> Dict[str, Any]:
+    return {
+        "book_id": book_id,
+        "channel": channel,
+        "message_hash": message_hash,
+        "status": status,
+        "detail": detail,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+def claim_delivery(campaign_id: str, book_id: str, channel: str, message_hash: str) -> bool:
+    """
+    Atomically claims a delivery before it is posted.
+
+    The check and the "sending" record are written under one lock, so when
+    two launches of the same campaign overlap only one of them posts to
+    each book and channel at a time.
+
+    Args:
+        campaign_id: The ID of the campaign.
+        book_id: The ID of the promoted book.
+        channel: The channel the message will be posted to (e.g. "x").
+        message_hash: A hash of the exact message that will be posted.
+
+    Returns:
+        True if the caller should post the message, False if it was already
+        delivered, a post for the book is being sent by another launch, or
+        the claim could not be saved.
+    """
+    key = delivery_key(book_id, channel)
+    try:
+        with _deliveries_lock(campaign_id):
+            deliveries = _load_campaign_deliveries(campaign_id)
+            existing = deliveries.get(key, {})
+
+            if existing.get("status") == "delivered" and existing.get("message_hash") == message_hash:
+                return False
+            if existing.get("status") == "sending":
+                claimed_at = datetime.fromisoformat(existing["timestamp"])
+                if (datetime.now(timezone.utc) - claimed_at).total_seconds() < SENDING_CLAIM_TIMEOUT:
+                    return False
+
+            deliveries[key] = _delivery_record(book_id, channel, message_hash, "sending", None)
+            _write_campaign_deliveries(campaign_id, deliveries)
+        return True
+    except IOError as e:
+        print(f"[ERROR] An error occurred while claiming delivery for campaign {campaign_id}: {e}")
+        return False
+
+def record_delivery(campaign_id: str, book_id: str, channel: str, message_hash: str, status: str, detail: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Records the outcome of a delivery in the campaign ledger, replacing any
+    earlier record for the same book and channel.
+
+    The read-modify-write is serialized with the campaign's lock and the file
+    is replaced atomically, so concurrent launches never lose each other's
+    records.
+
+    Args:
+        campaign_id: The ID of the campaign.
+        book_id: The ID of the promoted book.
+        channel: The channel the message was posted to (e.g. "x").
+        message_hash: A hash of the exact message that was posted.
+        status: Either "delivered" or "failed".
+        detail: An optional message describing the outcome.
+
+    Returns:
+        The stored delivery record, or None if it could not be saved.
+    """
+    record = _delivery_record(book_id, channel, message_hash, status, detail)
+    try:
+        with _deliveries_lock(campaign_id):
+            deliveries = _load_campaign_deliveries(campaign_id)
+            deliveries[delivery_key(book_id, channel)] = record
+            _write_campaign_deliveries(campaign_id, deliveries)
+        return record
+    except IOError as e:
+        print(f"[ERROR] An error occurred while recording delivery for campaign {campaign_id}: {e}")
+        return None
+
+if __name__ == "__main__":
+    # One-off maintenance step: `python -m app.storage` moves the legacy
+    # metrics file into the shards.
+    migrate_legacy_metrics()
@@ -0,0 +1,64 @@
+import os
+from typing import List
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+# Resolve paths from the package rather than the working directory, so the
+# app finds its templates however uvicorn is started.
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES_DIR = os.path.join(PROJECT_DIR, "templates")
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", os.path.join(PROJECT_DIR, ".jinja_cache"))
+
+class _BestEffortBytecodeCache(FileSystemBytecodeCache):
+    # Still serves a cache precompiled at build time from a read-only
+    # directory, and skips writing instead of failing the render.
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+def create_environment() -> Environment:
+    """
+    Creates the Jinja environment used by the app.
+
+    Compiled templates are stored in a bytecode cache on disk, so a fresh
+    worker loads them instead of compiling them from source. If the cache
+    directory can't be created (e.g. a read-only image where the build step
+    didn't run), templates are compiled in memory instead.
+    """
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        bytecode_cache = _BestEffortBytecodeCache(TEMPLATE_CACHE_DIR)
+    except OSError as e:
+        print(f"[WARNING] Template bytecode cache disabled, could not create {TEMPLATE_CACHE_DIR}: {e}")
+        bytecode_cache = None
+
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=bytecode_cache,
+        autoescape=True,
+    )
+
+def create_templates() -> Jinja2Templates:
+    return Jinja2Templates(env=create_environment())
+
+def warm_templates(templates: Jinja2Templates) -> List[str]:
+    """
+    Loads every template into the environment's in-memory cache, compiling
+    and writing the bytecode cache for any that aren't cached yet.
+
+    Returns:
+        The names of the loaded templates.
+    """
+    names = templates.env.list_templates()
+    for name in names:
+        templates.env.get_template(name)
+    return names
+
+if __name__ == "__main__":
+    # Build step: `python -m app.templating` fills the bytecode cache so
+    # workers never compile templates at runtime.
+    names = warm_templates(create_templates())
+    print(f"[INFO] Precompiled {len(names)} templates into {TEMPLATE_CACHE_DIR}")
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from unittest import mock
+import pytest
+from app import admission
+
+@pytest.mark.asyncio
+async def test_route_limiter_admits_within_limit():
+    # Arrange
+    limiter = admission.RouteLimiter("test", max_concurrent=2)
+
+    # Act
+    async with limiter.admit():
+        in_flight = limiter.in_flight
+
+    # Assert
+    assert in_flight == 1
+    assert limiter.in_flight == 0
+    assert limiter.admitted == 1
+
+@pytest.mark.asyncio
+async def test_route_limiter_sheds_after_max_queue_time():
+    # Arrange
+    limiter = admission.RouteLimiter("test", max_concurrent=1, target_queue_time=0.001, max_queue_time=0.01)
+
+    # Act
+    async with limiter.admit():
+        with pytest.raises(admission.Overloaded):
+            async with limiter.admit():
+                pass
+
+        # Assert: the route is now overloaded, so further requests are shed without waiting
+        assert limiter.should_shed()
+        with pytest.raises(admission.Overloaded):
+            async with limiter.admit():
+                pass
+
+    assert limiter.shed == 2
+    assert not limiter.should_shed()
+
+def test_click_sampler_scales_counts_by_sample_rate():
+    # Arrange
+    sampler = admission.ClickSampler(sample_rate=0.5)
+
+    # Act
+    with mock.patch("random.random", side_effect=[0.1, 0.9, 0.2, 0.3]):
+        for _ in range(4):
+            sampler.record("1")
+
+    # Assert
+    assert sampler.snapshot() == {"sample_rate": 0.5, "counts": {"1": 3}}
+    assert sampler.estimated_clicks() == {"1": 6}
+
+def test_click_sampler_drain_clears_counts():
+    # Arrange
+    sampler = admission.ClickSampler(sample_rate=0.5)
+    with mock.patch("random.random", return_value=0.0):
+        sampler.record("1")
+
+    # Act
+    drained = sampler.drain()
+
+    # Assert
+    assert drained == {"1": 2}
+    assert not sampler.has_samples()
+    assert sampler.drain() == {}
+
+@pytest.mark.asyncio
+async def test_storage_thread_wait_counts_as_queue_time():
+    # Arrange: keep every storage thread busy for a while
+    from app import async_storage
+    limiter = admission.RouteLimiter("test", max_concurrent=4)
+    busy = [
+        asyncio.ensure_future(async_storage.run(time.sleep, 0.05))
+        for _ in range(async_storage.STORAGE_MAX_WORKERS)
+    ]
+
+    # Act
+    async with limiter.admit():
+        await async_storage.run(lambda: None)
+    await asyncio.gather(*busy)
+
+    # Assert
+    assert limiter.queue_time_avg >= admission.QUEUE_TIME_SMOOTHING * 0.04
+
+@pytest.mark.asyncio
+async def test_storage_queue_time_is_applied_on_the_event_loop_thread():
+    # Arrange
+    import threading
+    from app import async_storage
+    limiter = admission.RouteLimiter("test", max_concurrent=4)
+    threads = []
+    observe = limiter._observe_queue_time
+
+    def recording_observe(seconds):
+        threads.append(threading.current_thread())
+        observe(seconds)
+
+    limiter._observe_queue_time = recording_observe
+
+    # Act
+    async with limiter.admit():
+        await async_storage.run(lambda: None)
+
+    # Assert: once for the admission and once for the storage wait
+    assert threads == [threading.current_thread()] * 2
+
+def test_observe_queue_time_outside_a_request_is_ignored():
+    # Act / Assert: no limiter is active, so nothing should fail
+    admission.observe_queue_time(1.0)
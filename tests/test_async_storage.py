@@ -0,0 +1,42 @@
+import asyncio
+import threading
+from unittest import mock
+import pytest
+from app import async_storage
+
+@pytest.mark.asyncio
+@mock.patch("app.storage.load_book_by_id")
+async def test_load_book_by_id_delegates_to_storage(mock_load_book):
+    # Arrange
+    mock_load_book.return_value = {"id": "1"}
+
+    # Act
+    book = await async_storage.load_book_by_id("1")
+
+    # Assert
+    assert book == {"id": "1"}
+    mock_load_book.assert_called_once_with("1")
+
+@pytest.mark.asyncio
+async def test_run_executes_off_the_event_loop_thread():
+    # Act
+    thread_name = await async_storage.run(lambda: threading.current_thread().name)
+
+    # Assert
+    assert thread_name != threading.main_thread().name
+    assert thread_name.startswith("storage")
+
+@pytest.mark.asyncio
+async def test_bulk_work_does_not_use_the_hot_storage_threads():
+    # Arrange: keep every bulk thread busy
+    release = threading.Event()
+    busy = [async_storage.run_bulk(release.wait, 5.0) for _ in range(async_storage.BULK_STORAGE_MAX_WORKERS)]
+    busy = [asyncio.ensure_future(call) for call in busy]
+
+    # Act
+    thread_name = await asyncio.wait_for(async_storage.run(lambda: threading.current_thread().name), 1.0)
+    release.set()
+    await asyncio.gather(*busy)
+
+    # Assert
+    assert thread_name.startswith("storage_")
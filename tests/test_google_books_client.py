@@ -1,7 +1,7 @@
 from unittest import mock
 import pytest
 import requests
-from app.google_books_client import fetch_books_by_author
+from app.google_books_client import fetch_books_by_author, fetch_books_by_isbn, fetch_books_bulk
 
 @mock.patch("requests.get")
 def test_fetch_books_by_author_success(mock_get):
@@ -41,3 +41,64 @@ def test_fetch_books_by_author_no_api_key():
 
     # Assert
     assert books == []
+
+@mock.patch("requests.get")
+def test_fetch_books_by_isbn_uses_isbn_query(mock_get):
+    # Arrange
+    mock_response = mock.Mock()
+    mock_response.json.return_value = {"items": [{"id": "isbn_book"}]}
+    mock_response.raise_for_status.return_value = None
+    mock_get.return_value = mock_response
+
+    # Act
+    books = fetch_books_by_isbn("9780000000001", "test_key")
+
+    # Assert
+    assert books == [{"id": "isbn_book"}]
+    assert mock_get.call_args.kwargs["params"]["q"] == "isbn:9780000000001"
+
+@mock.patch("requests.get")
+def test_fetch_books_bulk_yields_every_lookup(mock_get):
+    # Arrange
+    def fake_get(url, params):
+        response = mock.Mock()
+        response.json.return_value = {"items": [{"id": params["q"]}]}
+        response.raise_for_status.return_value = None
+        return response
+
+    mock_get.side_effect = fake_get
+
+    # Act
+    results = list(fetch_books_bulk(["Author A", "Author B"], ["123"], "test_key"))
+
+    # Assert
+    assert sorted((kind, query) for kind, query, _, _ in results) == [
+        ("author", "Author A"),
+        ("author", "Author B"),
+        ("isbn", "123"),
+    ]
+    for kind, query, books, error in results:
+        prefix = "inauthor:" if kind == "author" else "isbn:"
+        assert books == [{"id": f"{prefix}{query}"}]
+        assert error is None
+
+@mock.patch("requests.get")
+def test_fetch_books_bulk_reports_failed_lookups(mock_get):
+    # Arrange
+    mock_get.side_effect = requests.exceptions.RequestException("Test error")
+
+    # Act
+    results = list(fetch_books_bulk(["Author A"], [], "test_key"))
+
+    # Assert
+    assert len(results) == 1
+    _, _, books, error = results[0]
+    assert books == []
+    assert "Test error" in error
+
+def test_fetch_books_bulk_no_lookups():
+    # Act
+    results = list(fetch_books_bulk([], [], "test_key"))
+
+    # Assert
+    assert results == []
@@ -0,0 +1,85 @@
+import io
+import json
+import pytest
+from app import json_stream
+
+EVENTS = [
+    {"event_type": "click", "book_id": str(i), "value": i * 1.5, "tags": ["a", {"b": None}]}
+    for i in range(200)
+]
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_iter_array_matches_json_loads(chunk_size):
+    # Arrange
+    text = json.dumps(EVENTS, indent=4)
+
+    # Act
+    events = list(json_stream.iter_array(io.StringIO(text), chunk_size))
+
+    # Assert
+    assert events == EVENTS
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+def test_iter_object_matches_json_loads(chunk_size):
+    # Arrange
+    books = {str(i): {"id": str(i), "volumeInfo": {"title": f"Book {i}"}} for i in range(50)}
+
+    # Act
+    items = list(json_stream.iter_object(io.StringIO(json.dumps(books)), chunk_size))
+
+    # Assert
+    assert dict(items) == books
+    assert [key for key, _ in items] == list(books)
+
+@pytest.mark.parametrize("text, expected", [
+    ("[123456789, 42]", [123456789, 42]),
+    ("[1.5, 2]", [1.5, 2]),
+    ("[-1.5, 2]", [-1.5, 2]),
+    ("[1e10, 2]", [1e10, 2]),
+    ("[1.25E-3, 2]", [1.25e-3, 2]),
+    ("[12, -3.75e+2]", [12, -3.75e+2]),
+])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5])
+def test_numbers_split_across_chunks_are_not_truncated(text, expected, chunk_size):
+    # Act
+    values = list(json_stream.iter_array(io.StringIO(text), chunk_size))
+
+    # Assert
+    assert values == expected
+
+@pytest.mark.parametrize("text", ["", "  \n", "[]", " { } "])
+def test_empty_documents_yield_nothing(text):
+    # Act / Assert
+    iterate = json_stream.iter_object if text.strip().startswith("{") else json_stream.iter_array
+    assert list(iterate(io.StringIO(text))) == []
+
+@pytest.mark.parametrize("text", ["[1,]", "[1 2]", "[1", "{\"a\" 1}", "{1: 2}"])
+def test_malformed_documents_raise(text):
+    # Arrange
+    iterate = json_stream.iter_object if text.startswith("{") else json_stream.iter_array
+
+    # Act / Assert
+    with pytest.raises(json.JSONDecodeError):
+        list(iterate(io.StringIO(text), 2))
+
+def test_invalid_data_raises_without_reading_ahead():
+    # Arrange
+    text = '[{"event_type": clk}, ' + ", ".join(json.dumps(event) for event in EVENTS) + "]"
+    f = io.StringIO(text)
+
+    # Act
+    with pytest.raises(json.JSONDecodeError) as excinfo:
+        list(json_stream.iter_array(f, 16))
+
+    # Assert
+    assert not isinstance(excinfo.value, json_stream.TruncatedJsonError)
+    assert f.tell() <= 32
+
+@pytest.mark.parametrize("tail", ['{"event_type": "cl', '{"value": tr', '{"value": 1.', '{"a": "\\u00', ""])
+def test_file_ending_mid_element_raises_truncated(tail):
+    # Arrange
+    text = '[{"event_type": "click"}, ' + tail
+
+    # Act / Assert
+    with pytest.raises(json_stream.TruncatedJsonError):
+        list(json_stream.iter_array(io.StringIO(text), 4))
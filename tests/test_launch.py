@@ -0,0 +1,105 @@
+import threading
+import time
+from unittest import mock
+import pytest
+from app import launch
+from app import storage
+
+CAMPAIGN = {"id": "campaign_1", "book_ids": ["1", "2"], "promo_message": "Read this!"}
+BOOKS = {
+    "1": {"id": "1", "volumeInfo": {"title": "Book 1"}},
+    "2": {"id": "2", "volumeInfo": {"title": "Book 2"}},
+}
+
+@pytest.fixture
+def campaign_storage(tmp_path):
+    """Serves CAMPAIGN and BOOKS and keeps delivery ledgers in tmp_path."""
+    with mock.patch.object(storage, "DELIVERIES_DIR", tmp_path / "deliveries"), \
+            mock.patch.object(storage, "DELIVERIES_FILE", tmp_path / "deliveries.json"), \
+            mock.patch("app.storage.load_campaign_by_id", return_value=CAMPAIGN), \
+            mock.patch("app.storage.load_book_by_id", side_effect=BOOKS.get), \
+            mock.patch("app.storage.iter_books", side_effect=lambda: iter(BOOKS.items())):
+        yield
+
+@mock.patch("app.x_client.post_tweet")
+def test_launch_campaign_skips_delivered_posts_on_relaunch(mock_post_tweet, campaign_storage):
+    # Arrange
+    mock_post_tweet.side_effect = [
+        {"status": "success", "message": "ok"},
+        {"status": "error", "message": "failed"},
+        {"status": "success", "message": "ok"},
+    ]
+
+    # Act
+    launch.launch_campaign("campaign_1")
+    launch.launch_campaign("campaign_1")
+    status = launch.get_campaign_status("campaign_1")
+
+    # Assert: only the failed post for book 2 is retried
+    assert mock_post_tweet.call_count == 3
+    assert "Book 2" in mock_post_tweet.call_args.args[0]
+    assert status == {"campaign_id": "campaign_1", "total": 2, "delivered": 2, "pending": 0, "failed": 0}
+
+@mock.patch("app.x_client.post_tweet")
+def test_get_campaign_status_reports_pending_and_failed(mock_post_tweet, campaign_storage):
+    # Arrange
+    mock_post_tweet.return_value = {"status": "error", "message": "failed"}
+
+    # Act
+    before = launch.get_campaign_status("campaign_1")
+    launch.launch_campaign("campaign_1")
+    after = launch.get_campaign_status("campaign_1")
+
+    # Assert
+    assert before["pending"] == 2
+    assert after["failed"] == 2
+
+def test_overlapping_launches_post_each_book_once(campaign_storage):
+    # Arrange
+    posted = []
+    lock = threading.Lock()
+
+    def slow_post(message, *credentials):
+        with lock:
+            posted.append(message)
+        time.sleep(0.01)
+        return {"status": "success", "message": "ok"}
+
+    with mock.patch("app.x_client.post_tweet", side_effect=slow_post):
+        # Act
+        threads = [threading.Thread(target=launch.launch_campaign, args=("campaign_1",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # Assert
+    assert len(posted) == 2
+
+def test_get_campaign_status_counts_in_flight_posts_as_pending(campaign_storage):
+    # Arrange
+    message = launch.build_campaign_message(CAMPAIGN, "1", BOOKS["1"])
+    storage.claim_delivery("campaign_1", "1", launch.X_CHANNEL, launch.message_hash(message))
+
+    # Act
+    status = launch.get_campaign_status("campaign_1")
+
+    # Assert
+    assert status["pending"] == 2
+    assert status["delivered"] == 0
+
+@mock.patch("app.x_client.post_tweet")
+def test_launch_campaign_records_posts_that_raise_as_failed(mock_post_tweet, campaign_storage):
+    # Arrange
+    mock_post_tweet.side_effect = [ConnectionError("connection reset"), {"status": "success", "message": "ok"}]
+
+    # Act
+    launch.launch_campaign("campaign_1")
+    status = launch.get_campaign_status("campaign_1")
+    deliveries = storage.load_deliveries("campaign_1")
+
+    # Assert: the second book is still posted and the first can be retried
+    assert mock_post_tweet.call_count == 2
+    assert status["delivered"] == 1
+    assert status["failed"] == 1
+    assert "connection reset" in [record["detail"] for record in deliveries.values()]
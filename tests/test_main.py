@@ -1,7 +1,15 @@
+import asyncio
 import os
+import json
+import requests
+import subprocess
+import sys
 from unittest import mock
 from fastapi.testclient import TestClient
 from app.main import app
+from app import admission
+from app import storage
+from app import profiling
 
 client = TestClient(app)
 
@@ -43,6 +51,116 @@ def test_ingest_google_books_endpoint_no_api_key():
     assert response.status_code == 500
     assert response.json() == {"detail": "GOOGLE_BOOKS_API_KEY environment variable not set."}
 
+@mock.patch("app.storage.save_books")
+@mock.patch("app.google_books_client.fetch_books_bulk")
+def test_bulk_ingest_google_books_endpoint(mock_fetch_bulk, mock_save_books):
+    # Arrange
+    os.environ["GOOGLE_BOOKS_API_KEY"] = "test_key"
+    mock_fetch_bulk.return_value = iter([
+        ("author", "Author A", [{"id": "1"}, {"id": "2"}], None),
+        ("isbn", "123", [{"id": "2"}], None),
+    ])
+
+    # Act
+    response = client.post(
+        "/ingest/google-books/bulk",
+        json={"author_names": ["Author A"], "isbns": ["123"]},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [chunk for chunk in response.text.split("\n\n") if chunk]
+    assert len(events) == 3
+    assert events[0].startswith("event: progress")
+    assert '"author": "Author A"' in events[0]
+    assert events[-1] == 'event: done\ndata: {"completed": 2, "failed": 0, "books_ingested": 2}'
+    mock_fetch_bulk.assert_called_once_with(["Author A"], ["123"], "test_key")
+    mock_save_books.assert_called_once_with([{"id": "1"}, {"id": "2"}])
+
+    # Clean up
+    del os.environ["GOOGLE_BOOKS_API_KEY"]
+
+@mock.patch("app.storage.save_books")
+@mock.patch("requests.get")
+def test_bulk_ingest_reports_failed_lookups(mock_get, mock_save_books):
+    # Arrange
+    os.environ["GOOGLE_BOOKS_API_KEY"] = "test_key"
+    mock_get.side_effect = requests.exceptions.ConnectionError("connection refused")
+
+    # Act
+    response = client.post("/ingest/google-books/bulk", json={"author_names": ["Author A"]})
+
+    # Assert
+    events = [chunk for chunk in response.text.split("\n\n") if chunk]
+    progress = json.loads(events[0].split("data: ", 1)[1])
+    assert progress["books_found"] == 0
+    assert "connection refused" in progress["error"]
+    assert events[-1] == 'event: done\ndata: {"completed": 1, "failed": 1, "books_ingested": 0}'
+    mock_save_books.assert_not_called()
+
+    # Clean up
+    del os.environ["GOOGLE_BOOKS_API_KEY"]
+
+@mock.patch("app.storage.save_books")
+@mock.patch("app.google_books_client.fetch_books_bulk")
+def test_bulk_ingest_saves_fetched_books_when_the_client_disconnects(mock_fetch_bulk, mock_save_books):
+    # Arrange
+    from app import main
+    os.environ["GOOGLE_BOOKS_API_KEY"] = "test_key"
+    mock_fetch_bulk.return_value = iter([
+        ("author", "Author A", [{"id": "1"}], None),
+        ("author", "Author B", [{"id": "2"}], None),
+    ])
+
+    async def read_first_event_then_disconnect():
+        response = await main.bulk_ingest_google_books_endpoint(
+            main.BulkIngestRequest(author_names=["Author A", "Author B"])
+        )
+        stream = response.body_iterator
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    # Act
+    first = asyncio.run(read_first_event_then_disconnect())
+
+    # Assert
+    assert first.startswith("event: progress")
+    mock_save_books.assert_called_once_with([{"id": "1"}])
+
+    # Clean up
+    del os.environ["GOOGLE_BOOKS_API_KEY"]
+
+def test_bulk_ingest_google_books_endpoint_empty_request():
+    # Arrange
+    os.environ["GOOGLE_BOOKS_API_KEY"] = "test_key"
+
+    # Act
+    response = client.post("/ingest/google-books/bulk", json={})
+
+    # Assert
+    assert response.status_code == 400
+
+    # Clean up
+    del os.environ["GOOGLE_BOOKS_API_KEY"]
+
+@mock.patch("app.google_books_client.fetch_books_bulk")
+def test_bulk_ingest_google_books_endpoint_overloaded(mock_fetch_bulk):
+    # Arrange
+    os.environ["GOOGLE_BOOKS_API_KEY"] = "test_key"
+
+    # Act
+    with mock.patch.object(admission.limiters["ingest"], "should_shed", return_value=True):
+        response = client.post("/ingest/google-books/bulk", json={"author_names": ["Author A"]})
+
+    # Assert
+    assert response.status_code == 503
+    mock_fetch_bulk.assert_not_called()
+
+    # Clean up
+    del os.environ["GOOGLE_BOOKS_API_KEY"]
+
 @mock.patch("app.storage.load_book_by_id")
 def test_get_book_page_found(mock_load_book):
     # Arrange
@@ -115,6 +233,32 @@ def test_launch_campaign_endpoint(mock_launch_campaign):
     # We can't easily assert that the background task was called with the right args
     # without more complex testing setup, so we trust the endpoint returns success.
 
+@mock.patch("app.launch.get_campaign_status")
+def test_get_campaign_status_endpoint(mock_get_status):
+    # Arrange
+    campaign_id = "test_campaign_id"
+    mock_get_status.return_value = {"campaign_id": campaign_id, "total": 2, "delivered": 1, "pending": 1, "failed": 0}
+
+    # Act
+    response = client.get(f"/campaigns/{campaign_id}/status")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["delivered"] == 1
+    mock_get_status.assert_called_once_with(campaign_id)
+
+@mock.patch("app.launch.get_campaign_status")
+def test_get_campaign_status_endpoint_not_found(mock_get_status):
+    # Arrange
+    mock_get_status.return_value = None
+
+    # Act
+    response = client.get("/campaigns/missing/status")
+
+    # Assert
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Campaign not found"}
+
 @mock.patch("app.storage.load_book_by_id")
 @mock.patch("app.storage.log_event")
 def test_track_click(mock_log_event, mock_load_book):
@@ -134,8 +278,78 @@ def test_track_click(mock_log_event, mock_load_book):
     assert redirect_response.headers["location"] == f"/books/{book_id}"
     mock_log_event.assert_called_once_with({"event_type": "click", "book_id": book_id})
 
-@mock.patch("app.storage.load_metrics")
-def test_get_analytics(mock_load_metrics):
+@mock.patch("app.storage.log_event")
+def test_track_click_degraded_mode(mock_log_event):
+    # Arrange
+    book_id = "test_book_id"
+    sampler = admission.ClickSampler(sample_rate=1.0)
+
+    # Act
+    with mock.patch.object(admission.limiters["track"], "should_shed", return_value=True), \
+            mock.patch.object(admission, "click_sampler", sampler):
+        response = client.get(f"/track/{book_id}", follow_redirects=False)
+
+    # Assert
+    assert response.status_code == 307
+    assert response.headers["location"] == f"/books/{book_id}"
+    mock_log_event.assert_not_called()
+    assert sampler.snapshot()["counts"] == {book_id: 1}
+
+@mock.patch("app.storage.load_book_by_id")
+def test_get_book_page_overloaded(mock_load_book):
+    # Act
+    with mock.patch.object(admission.limiters["books"], "should_shed", return_value=True):
+        response = client.get("/books/test_id")
+
+    # Assert
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    mock_load_book.assert_not_called()
+
+def test_get_analytics_reports_unflushed_sampled_clicks_per_worker(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    with open(storage.METRICS_FILE, "w") as f:
+        json.dump([{"event_type": "click", "book_id": "1"}], f)
+    sampler = admission.ClickSampler(sample_rate=0.5)
+    with mock.patch("random.random", return_value=0.0):
+        sampler.record("1")
+        sampler.record("2")
+
+    # Act
+    with mock.patch.object(admission, "click_sampler", sampler):
+        response = client.get("/analytics")
+
+    # Assert: estimates aren't mixed into the stored totals
+    assert response.status_code == 200
+    assert response.json() == {
+        "total_clicks": 1,
+        "clicks_per_book": {"1": 1},
+        "unflushed_sampled_clicks": {
+            "worker_pid": os.getpid(),
+            "sample_rate": 0.5,
+            "estimated_clicks_per_book": {"1": 2, "2": 2},
+        },
+    }
+
+def test_sampled_clicks_are_flushed_once_track_recovers(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    sampler = admission.ClickSampler(sample_rate=0.5)
+    with mock.patch("random.random", return_value=0.0):
+        sampler.record("1")
+        sampler.record("1")
+
+    # Act
+    with mock.patch.object(admission, "click_sampler", sampler):
+        client.get("/track/2", follow_redirects=False)
+        response = client.get("/analytics")
+
+    # Assert
+    assert response.json() == {"total_clicks": 5, "clicks_per_book": {"1": 4, "2": 1}}
+    assert not sampler.has_samples()
+
+def test_get_analytics(tmp_path):
     # Arrange
     mock_metrics = [
         {"event_type": "click", "book_id": "1"},
@@ -143,7 +357,9 @@ def test_get_analytics(mock_load_metrics):
         {"event_type": "click", "book_id": "2"},
         {"event_type": "other_event", "book_id": "1"},
     ]
-    mock_load_metrics.return_value = mock_metrics
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    with open(storage.METRICS_FILE, "w") as f:
+        json.dump(mock_metrics, f)
 
     # Act
     response = client.get("/analytics")
@@ -158,3 +374,155 @@ def test_get_analytics(mock_load_metrics):
         }
     }
     assert response.json() == expected_analytics
+
+def test_slow_requests_endpoint_records_stage_breakdown(tmp_path):
+    # Arrange
+    os.environ["ADMIN_API_KEY"] = "admin_key"
+    storage.BOOKS_FILE = tmp_path / "test_books.json"
+    with open(storage.BOOKS_FILE, "w") as f:
+        json.dump({"1": {"id": "1", "volumeInfo": {"title": "Book 1", "authors": []}}}, f)
+    profiling.clear_slow_requests()
+
+    # Act
+    with mock.patch.object(profiling, "SLOW_REQUEST_THRESHOLD", 0.0):
+        client.get("/books/1")
+    response = client.get("/admin/slow-requests", headers={"X-Admin-Key": "admin_key"})
+
+    # Assert
+    assert response.status_code == 200
+    recorded = [r for r in response.json()["requests"] if r["path"] == "/books/1"]
+    assert len(recorded) == 1
+    assert {"storage_load", "json_parse", "template_render"} <= set(recorded[0]["stages_ms"])
+
+    # Clean up
+    del os.environ["ADMIN_API_KEY"]
+
+@mock.patch("app.profiling.sample_stacks")
+def test_profile_endpoint(mock_sample_stacks):
+    # Arrange
+    os.environ["ADMIN_API_KEY"] = "admin_key"
+    mock_sample_stacks.return_value = {"main.py:handler;storage.py:load_books": 3}
+
+    # Act
+    response = client.post("/admin/profile?seconds=1", headers={"X-Admin-Key": "admin_key"})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.text == "main.py:handler;storage.py:load_books 3\n"
+    mock_sample_stacks.assert_called_once_with(1.0)
+
+    # Clean up
+    del os.environ["ADMIN_API_KEY"]
+
+def test_profile_endpoint_requires_admin_key():
+    # Arrange
+    os.environ["ADMIN_API_KEY"] = "admin_key"
+
+    # Act
+    response = client.post("/admin/profile?seconds=1", headers={"X-Admin-Key": "wrong"})
+    missing_key_response = client.post("/admin/profile?seconds=1")
+
+    # Assert
+    assert response.status_code == 403
+    assert missing_key_response.status_code == 403
+
+    # Clean up
+    del os.environ["ADMIN_API_KEY"]
+
+def test_lifespan_warms_caches_and_reports_startup():
+    # Arrange
+    os.environ["ADMIN_API_KEY"] = "admin_key"
+
+    # Act
+    with TestClient(app) as startup_client:
+        response = startup_client.get("/admin/startup", headers={"X-Admin-Key": "admin_key"})
+
+    # Assert
+    assert response.status_code == 200
+    report = response.json()
+    assert "book.html" in report["templates"]
+    assert {"import_ms", "templates_ms", "storage_pool_ms", "startup_ms"} <= set(report)
+
+    # Clean up
+    del os.environ["ADMIN_API_KEY"]
+
+def test_integrations_are_not_imported_at_startup():
+    # Act: start the app in a fresh interpreter and serve a first request
+    result = subprocess.run(
+        [sys.executable, "-c", (
+            "import sys, app.main; "
+            "from fastapi.testclient import TestClient; "
+            "TestClient(app.main.app).__enter__().get('/'); "
+            "print(sorted(m for m in ('requests', 'app.launch', 'app.google_books_client', 'app.x_client') if m in sys.modules))"
+        )],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+    # Assert
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+def test_admission_stats_endpoint():
+    # Arrange
+    os.environ["ADMIN_API_KEY"] = "admin_key"
+
+    # Act
+    response = client.get("/admin/admission", headers={"X-Admin-Key": "admin_key"})
+
+    # Assert
+    assert response.status_code == 200
+    assert set(response.json()["routes"]) == set(admission.limiters)
+    assert response.json()["routes"]["track"]["max_concurrent"] == admission.limiters["track"].max_concurrent
+
+    # Clean up
+    del os.environ["ADMIN_API_KEY"]
+
+@mock.patch("app.storage.save_books")
+@mock.patch("requests.get")
+def test_bulk_ingest_records_outbound_http_stage(mock_get, mock_save_books):
+    # Arrange
+    os.environ["GOOGLE_BOOKS_API_KEY"] = "test_key"
+    mock_response = mock.Mock()
+    mock_response.json.return_value = {"items": [{"id": "1"}]}
+    mock_response.raise_for_status.return_value = None
+    mock_get.return_value = mock_response
+    profiling.clear_slow_requests()
+
+    # Act
+    with mock.patch.object(profiling, "SLOW_REQUEST_THRESHOLD", 0.0):
+        response = client.post("/ingest/google-books/bulk", json={"author_names": ["Author A", "Author B"]})
+
+    # Assert
+    assert response.status_code == 200
+    recorded = [r for r in profiling.slow_requests() if r["path"] == "/ingest/google-books/bulk"]
+    assert len(recorded) == 1
+    assert recorded[0]["status_code"] == 200
+    assert "outbound_http" in recorded[0]["stages_ms"]
+
+    # Clean up
+    del os.environ["GOOGLE_BOOKS_API_KEY"]
+
+def test_integration_modules_are_imported_off_the_event_loop():
+    # Arrange
+    import threading
+    from app import main
+    saved_module = sys.modules.pop("app.x_client")
+    import_threads = []
+    real_import_module = main.importlib.import_module
+
+    def recording_import_module(name):
+        import_threads.append(threading.current_thread())
+        return real_import_module(name)
+
+    # Act
+    try:
+        with mock.patch.object(main.importlib, "import_module", side_effect=recording_import_module):
+            module = asyncio.run(main._integration("x_client"))
+    finally:
+        sys.modules["app.x_client"] = saved_module
+
+    # Assert
+    assert module.__name__ == "app.x_client"
+    assert len(import_threads) == 1
+    assert import_threads[0] is not threading.main_thread()
+    assert "x_client" in main.startup_report["integration_imports_ms"]
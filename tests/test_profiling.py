@@ -0,0 +1,70 @@
+import threading
+import time
+from unittest import mock
+import pytest
+from app import profiling
+
+def test_sample_stacks_captures_other_threads():
+    # Arrange
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            time.sleep(0.001)
+
+    worker = threading.Thread(target=busy_worker)
+    worker.start()
+
+    # Act
+    try:
+        counts = profiling.sample_stacks(0.05, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    # Assert
+    assert any("busy_worker" in stack for stack in counts)
+    assert profiling.collapse_stacks({"a;b": 2, "a;c": 5}) == "a;c 5\na;b 2\n"
+
+def test_sample_stacks_rejects_concurrent_profiles():
+    # Arrange
+    profiling._profile_lock.acquire()
+
+    # Act / Assert
+    try:
+        with pytest.raises(profiling.ProfilerBusy):
+            profiling.sample_stacks(0.01)
+    finally:
+        profiling._profile_lock.release()
+
+def test_track_request_records_stages_of_slow_requests():
+    # Arrange
+    profiling.clear_slow_requests()
+
+    # Act
+    with mock.patch.object(profiling, "SLOW_REQUEST_THRESHOLD", 0.0):
+        with profiling.track_request("GET", "/books/1") as info:
+            with profiling.stage("storage_load"):
+                pass
+            with profiling.stage("storage_load"):
+                pass
+            info["status_code"] = 200
+
+    # Assert
+    recorded = profiling.slow_requests()
+    assert len(recorded) == 1
+    assert recorded[0]["path"] == "/books/1"
+    assert recorded[0]["status_code"] == 200
+    assert list(recorded[0]["stages_ms"]) == ["storage_load"]
+
+def test_track_request_ignores_fast_requests():
+    # Arrange
+    profiling.clear_slow_requests()
+
+    # Act
+    with mock.patch.object(profiling, "SLOW_REQUEST_THRESHOLD", 60.0):
+        with profiling.track_request("GET", "/"):
+            pass
+
+    # Assert
+    assert profiling.slow_requests() == []
@@ -1,5 +1,8 @@
 import os
 import json
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
 from app import storage
 
 def test_save_and_load_books(tmp_path):
@@ -122,3 +125,296 @@ def test_log_event_and_load_metrics(tmp_path):
     assert len(loaded_metrics) == 2
     assert loaded_metrics[0]["event_type"] == "click"
     assert "timestamp" in loaded_metrics[0]
+
+def test_record_and_load_deliveries(tmp_path):
+    # Arrange
+    storage.DELIVERIES_DIR = tmp_path / "deliveries"
+
+    # Act
+    storage.record_delivery("campaign_1", "book_1", "x", "abc", "delivered")
+    storage.record_delivery("campaign_1", "book_2", "x", "def", "failed", "API error")
+    storage.record_delivery("campaign_2", "book_1", "x", "abc", "delivered")
+    deliveries = storage.load_deliveries("campaign_1")
+
+    # Assert
+    assert len(deliveries) == 2
+    assert deliveries[storage.delivery_key("book_1", "x")]["status"] == "delivered"
+    assert deliveries[storage.delivery_key("book_2", "x")]["detail"] == "API error"
+    assert storage.load_deliveries("missing_campaign") == {}
+    assert os.path.exists(storage.deliveries_file("campaign_2"))
+
+def test_new_message_replaces_the_superseded_delivery(tmp_path):
+    # Arrange
+    storage.DELIVERIES_DIR = tmp_path / "deliveries"
+    storage.record_delivery("campaign_1", "book_1", "x", "old", "delivered")
+
+    # Act
+    claimed = storage.claim_delivery("campaign_1", "book_1", "x", "new")
+    storage.record_delivery("campaign_1", "book_1", "x", "new", "delivered")
+    deliveries = storage.load_deliveries("campaign_1")
+
+    # Assert
+    assert claimed is True
+    assert list(deliveries) == [storage.delivery_key("book_1", "x")]
+    assert deliveries[storage.delivery_key("book_1", "x")]["message_hash"] == "new"
+
+def test_load_deliveries_reads_the_legacy_ledger(tmp_path):
+    # Arrange
+    storage.DELIVERIES_DIR = tmp_path / "deliveries"
+    legacy_file = tmp_path / "test_deliveries.json"
+    record = {"book_id": "book_1", "channel": "x", "message_hash": "abc", "status": "delivered", "detail": None, "timestamp": "2025-01-01T00:00:00+00:00"}
+    with open(legacy_file, "w") as f:
+        json.dump({"campaign_1": {"book_1:x:abc": record}}, f)
+
+    # Act / Assert
+    with mock.patch.object(storage, "DELIVERIES_FILE", legacy_file):
+        assert storage.load_deliveries("campaign_1") == {"book_1:x": record}
+        assert storage.claim_delivery("campaign_1", "book_1", "x", "abc") is False
+
+def test_log_event_writes_to_book_shard(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+
+    # Act
+    storage.log_event({"event_type": "click", "book_id": "1"})
+
+    # Assert
+    shard_file = storage.metrics_shard_file(storage.metrics_shard_for("1"))
+    with open(shard_file) as f:
+        assert json.loads(f.readline())["book_id"] == "1"
+    assert not os.path.exists(storage.METRICS_FILE)
+
+def test_aggregate_clicks_merges_legacy_file_and_shards(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    with open(storage.METRICS_FILE, "w") as f:
+        json.dump([{"event_type": "click", "book_id": "1"}], f)
+    for book_id in ["1", "2", "3", "3"]:
+        storage.log_event({"event_type": "click", "book_id": book_id})
+    storage.log_event({"event_type": "other_event", "book_id": "1"})
+
+    # Act
+    in_process = storage.aggregate_clicks()
+    storage.PARALLEL_AGGREGATION_MIN_BYTES = 0
+    try:
+        parallel = storage.aggregate_clicks()
+        parallel_again = storage.aggregate_clicks()
+    finally:
+        storage.PARALLEL_AGGREGATION_MIN_BYTES = 1_000_000
+        storage.shutdown_aggregation_pool()
+
+    # Assert
+    expected = {"total_clicks": 5, "clicks_per_book": {"1": 2, "2": 1, "3": 2}}
+    assert in_process == expected
+    assert parallel == expected
+    assert parallel_again == expected
+
+def test_iter_books_streams_catalog(tmp_path):
+    # Arrange
+    storage.BOOKS_FILE = tmp_path / "test_books.json"
+    storage.save_books([{"id": "1", "volumeInfo": {"title": "Book 1"}}, {"id": "2", "volumeInfo": {"title": "Book 2"}}])
+
+    # Act
+    books = list(storage.iter_books())
+
+    # Assert
+    assert [book_id for book_id, _ in books] == ["1", "2"]
+    assert books[1][1]["volumeInfo"]["title"] == "Book 2"
+
+def test_iter_metrics_streams_all_files(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    with open(storage.METRICS_FILE, "w") as f:
+        json.dump([{"event_type": "click", "book_id": "legacy"}], f)
+    storage.log_event({"event_type": "click", "book_id": "1"})
+
+    # Act
+    events = list(storage.iter_metrics())
+
+    # Assert
+    assert sorted(event["book_id"] for event in events) == ["1", "legacy"]
+
+def test_load_books_malformed_file(tmp_path):
+    # Arrange
+    storage.BOOKS_FILE = tmp_path / "test_books.json"
+    with open(storage.BOOKS_FILE, "w") as f:
+        f.write('{"1": {"id": "1"}, "2": ')
+
+    # Act
+    loaded_books = storage.load_books()
+
+    # Assert: everything before the corruption is still readable
+    assert loaded_books == {"1": {"id": "1"}}
+
+def test_claim_delivery_is_exclusive(tmp_path):
+    # Arrange
+    storage.DELIVERIES_DIR = tmp_path / "deliveries"
+
+    # Act
+    first = storage.claim_delivery("campaign_1", "book_1", "x", "abc")
+    second = storage.claim_delivery("campaign_1", "book_1", "x", "abc")
+    storage.record_delivery("campaign_1", "book_1", "x", "abc", "failed")
+    retry = storage.claim_delivery("campaign_1", "book_1", "x", "abc")
+    storage.record_delivery("campaign_1", "book_1", "x", "abc", "delivered")
+    after_delivery = storage.claim_delivery("campaign_1", "book_1", "x", "abc")
+
+    # Assert
+    assert first is True
+    assert second is False
+    assert retry is True
+    assert after_delivery is False
+
+def test_claim_delivery_reclaims_stale_sending_records(tmp_path):
+    # Arrange
+    storage.DELIVERIES_DIR = tmp_path / "deliveries"
+    storage.claim_delivery("campaign_1", "book_1", "x", "abc")
+
+    # Act / Assert
+    with mock.patch.object(storage, "SENDING_CLAIM_TIMEOUT", 0):
+        assert storage.claim_delivery("campaign_1", "book_1", "x", "abc") is True
+
+def test_concurrent_writes_are_not_lost(tmp_path):
+    # Arrange
+    storage.BOOKS_FILE = tmp_path / "test_books.json"
+    storage.CAMPAIGNS_FILE = tmp_path / "test_campaigns.json"
+
+    # Act
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for i in range(50):
+            executor.submit(storage.save_books, [{"id": str(i)}])
+            executor.submit(storage.save_campaign, {"name": f"Campaign {i}"})
+
+    # Assert
+    assert len(storage.load_books()) == 50
+    assert len(storage.load_campaigns()) == 50
+    assert not os.path.exists(f"{storage.BOOKS_FILE}.tmp")
+
+def test_aggregate_clicks_never_sees_partial_shards(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    storage.log_event({"event_type": "click", "book_id": "1"})
+
+    def write_events():
+        for _ in range(100):
+            storage.log_event({"event_type": "click", "book_id": "1"})
+
+    writer = threading.Thread(target=write_events)
+
+    # Act
+    totals = []
+    writer.start()
+    while writer.is_alive():
+        totals.append(storage.aggregate_clicks()["total_clicks"])
+    writer.join()
+
+    # Assert: counts only ever grow while the shard is being appended to
+    assert all(total >= 1 for total in totals)
+    assert totals == sorted(totals)
+    assert storage.aggregate_clicks()["total_clicks"] == 101
+
+def test_log_event_appends_without_reading_the_shard(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    storage.log_event({"event_type": "click", "book_id": "1"})
+    shard_file = storage.metrics_shard_file(storage.metrics_shard_for("1"))
+
+    # Act
+    with mock.patch.object(storage, "_iter_events_file", side_effect=AssertionError("shard was read")):
+        storage.log_event({"event_type": "click", "book_id": "1"})
+        storage.log_event({"event_type": "other_event", "book_id": "1"})
+
+    # Assert: one line per event
+    with open(shard_file) as f:
+        events = [json.loads(line) for line in f]
+    assert [event["event_type"] for event in events] == ["click", "click", "other_event"]
+
+def test_corrupt_event_in_the_middle_of_a_file_is_reported(tmp_path, capsys):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    with open(storage.METRICS_FILE, "w") as f:
+        f.write('[{"event_type": "click"}, {"event_type": clk}, {"event_type": "click"}]')
+
+    # Act
+    events = list(storage.iter_metrics())
+
+    # Assert
+    assert len(events) == 1
+    assert "[ERROR]" in capsys.readouterr().out
+
+def test_damaged_shard_lines_do_not_hide_later_events(tmp_path, capsys):
+    # Arrange: a writer died mid-line, and a later line is corrupt
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    shard_file = storage.metrics_shard_file(storage.metrics_shard_for("1"))
+    with open(shard_file, "w") as f:
+        f.write('{"event_type": "click", "book_id": "1"}\n{"event_type": clk}\n{"event_type": "click", "book_id": "1"}\n{"event_ty')
+
+    # Act
+    storage.log_event({"event_type": "click", "book_id": "1"})
+    events = list(storage.iter_metrics())
+
+    # Assert
+    assert len(events) == 3
+    assert capsys.readouterr().out.count("[ERROR] Skipped an invalid event") == 2
+
+def test_partly_written_last_line_is_skipped(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    shard_file = storage.metrics_shard_file(storage.metrics_shard_for("1"))
+    with open(shard_file, "w") as f:
+        f.write('{"event_type": "click", "book_id": "1"}\n{"event_type": "cl')
+
+    # Act / Assert
+    assert storage.aggregate_clicks()["total_clicks"] == 1
+
+def test_legacy_array_shards_are_still_read(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    with open(tmp_path / "test_metrics.3.json", "w") as f:
+        json.dump([{"event_type": "click", "book_id": "old"}], f)
+    storage.log_event({"event_type": "click", "book_id": "new"})
+
+    # Act
+    analytics = storage.aggregate_clicks()
+
+    # Assert
+    assert analytics["clicks_per_book"] == {"old": 1, "new": 1}
+
+def test_migrate_legacy_metrics_spreads_history_across_shards(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    legacy_events = [{"event_type": "click", "book_id": str(i % 20)} for i in range(100)]
+    with open(storage.METRICS_FILE, "w") as f:
+        json.dump(legacy_events, f)
+    storage.log_event({"event_type": "click", "book_id": "1"})
+    before = storage.aggregate_clicks()
+
+    # Act
+    migrated = storage.migrate_legacy_metrics()
+
+    # Assert
+    assert migrated == 100
+    assert storage.aggregate_clicks() == before
+    assert not os.path.exists(storage.METRICS_FILE)
+    assert os.path.exists(f"{storage.METRICS_FILE}.migrated")
+    shards_with_history = [
+        shard for shard in range(storage.METRICS_SHARDS)
+        if os.path.exists(storage.migrated_metrics_shard_file(shard))
+        and os.path.getsize(storage.migrated_metrics_shard_file(shard)) > 0
+    ]
+    assert len(shards_with_history) > 1
+    assert storage.migrate_legacy_metrics() == 0
+
+def test_migrate_legacy_metrics_leaves_a_damaged_file_in_place(tmp_path):
+    # Arrange
+    storage.METRICS_FILE = tmp_path / "test_metrics.json"
+    with open(storage.METRICS_FILE, "w") as f:
+        f.write('[{"event_type": "click", "book_id": "1"}, {"event_type": clk}]')
+
+    # Act
+    migrated = storage.migrate_legacy_metrics()
+
+    # Assert
+    assert migrated is None
+    assert os.path.exists(storage.METRICS_FILE)
+    assert not [path for path in os.listdir(tmp_path) if "legacy" in path]
+    assert storage.aggregate_clicks()["total_clicks"] == 1
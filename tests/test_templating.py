@@ -0,0 +1,25 @@
+from unittest import mock
+from app import templating
+
+BOOK = {"volumeInfo": {"title": "Test Book Title", "authors": ["Test Author"]}}
+
+def test_create_environment_without_writable_cache_dir():
+    # Act
+    with mock.patch("os.makedirs", side_effect=PermissionError("read-only file system")):
+        env = templating.create_environment()
+
+    # Assert: templates still render, just without a bytecode cache
+    assert env.bytecode_cache is None
+    assert "Test Book Title" in env.get_template("book.html").render(book=BOOK)
+
+def test_bytecode_cache_write_failures_do_not_break_rendering(tmp_path):
+    # Arrange
+    with mock.patch.object(templating, "TEMPLATE_CACHE_DIR", str(tmp_path)):
+        env = templating.create_environment()
+
+    # Act
+    with mock.patch("tempfile.NamedTemporaryFile", side_effect=PermissionError("read-only file system")):
+        template = env.get_template("book.html")
+
+    # Assert
+    assert "Test Book Title" in template.render(book=BOOK)